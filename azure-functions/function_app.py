@@ -1,27 +1,35 @@
 import azure.functions as func
 import asyncio
 import aiohttp
-import json
+import orjson
 import logging
 import os
 import time
 import gzip
-from datetime import datetime, date, timedelta
-from typing import Dict, Any, List, Tuple, Optional
-from functools import wraps
-from bs4 import BeautifulSoup
+import heapq
+import threading
+import atexit
+import multiprocessing
+from array import array
+from math import isnan, nan
+from datetime import datetime, date, timedelta, timezone
+from typing import Dict, Any, Callable, Iterable, List, Mapping, Tuple, Optional
+from functools import wraps, lru_cache
+from operator import attrgetter
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
 import hashlib
 import re
 import base64
 import binascii
 
-from models import ThreadInfo, ROFREntry, ResortCodes
+from models import ThreadInfo, ROFREntry, ResortCodes, ResultCodes
 from table_storage_manager import OptimizedAzureTableStorageManager
-from statistics_manager import StatisticsManager
+from statistics_manager import StatisticsManager, VGC_VARIATION_RE
 from statistics_calculator import StatisticsCalculator
 from queue_manager import ROFRQueueManager
 from rofr_scraper_azure import AzureROFRScraper
-from rofr_parsing_utils import ROFRParsingUtils
+from rofr_parsing_utils import ROFRParsingUtils, HTML_PARSER, parse_page_entries
 
 # Initialize Function App
 app = func.FunctionApp()
@@ -37,8 +45,92 @@ logger = logging.getLogger(__name__)
 # Global flag for statistics calculation
 _stats_calculation_in_progress = False
 
+# Only build the pagination elements when parsing a page just to count pages
+PAGE_NAV_STRAINER = SoupStrainer(['nav', 'div'], class_=re.compile(r'pageNav'))
+
+# Byte patterns for reading the page count straight from the raw HTML
+_DATA_PAGE_RE = re.compile(rb'data-page="(\d+)"')
+_PAGE_OF_RE = re.compile(rb'Page\s+\d+\s+of\s+(\d+)')
+PAGE_NAV_PROBE_BYTES = 32768
+
+# Text pattern for the "Page X of N" indicator inside parsed pagination elements
+_PAGE_OF_TEXT_RE = re.compile(r'Page \d+ of (\d+)')
+
+# Connection pool shared by every CompleteThreadProcessor session in this worker
+_shared_connector: Optional[aiohttp.TCPConnector] = None
+_shared_connector_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def get_shared_connector() -> aiohttp.TCPConnector:
+    """Get the shared TCP connector for the running event loop, creating it if needed."""
+    global _shared_connector, _shared_connector_loop
+    loop = asyncio.get_running_loop()
+    if _shared_connector is None or _shared_connector.closed or _shared_connector_loop is not loop:
+        _shared_connector = aiohttp.TCPConnector(
+            limit=100,
+            limit_per_host=50,
+            ttl_dns_cache=600,
+            use_dns_cache=True,
+            keepalive_timeout=60
+        )
+        _shared_connector_loop = loop
+    return _shared_connector
+
+# Threads found completed and older than 90 days, mapped to their page count. Such threads
+# never change again, so warm invocations skip them without touching storage.
+_stale_threads: Dict[str, Optional[int]] = {}
+
+# Process pool for CPU-bound HTML parsing, kept for the worker process lifetime; None on
+# single-core hosts where it would only add overhead
+_parse_pool: Optional[ProcessPoolExecutor] = None
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Get the HTML parsing process pool, creating it on first use."""
+    global _parse_pool
+    cpu_count = os.cpu_count() or 1
+    if _parse_pool is None and cpu_count > 1:
+        # Spawn rather than fork: the Functions worker is multi-threaded (gRPC, event loop)
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=cpu_count,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        atexit.register(shutdown_parse_pool)
+    return _parse_pool
+
+def shutdown_parse_pool():
+    """Shut down the HTML parsing process pool if it was started."""
+    global _parse_pool
+    if _parse_pool is not None:
+        _parse_pool.shutdown(wait=False, cancel_futures=True)
+        _parse_pool = None
+
+# In-process cache for slow-changing API data, shared across warm invocations
+RESPONSE_CACHE_TTL = 300
+DASHBOARD_CACHE_TTL = 60
+HEALTH_CHECK_CACHE_TTL = 30
+_response_cache: Dict[str, Tuple[float, Any]] = {}
+_response_cache_lock = threading.Lock()
+
+def cache_get(key: str, ttl: float = RESPONSE_CACHE_TTL) -> Optional[Any]:
+    """Get a cached value if it is younger than ttl seconds."""
+    with _response_cache_lock:
+        cached = _response_cache.get(key)
+    if cached is not None and time.time() - cached[0] < ttl:
+        return cached[1]
+    return None
+
+def cache_set(key: str, value: Any) -> None:
+    """Store a value in the response cache."""
+    with _response_cache_lock:
+        _response_cache[key] = (time.time(), value)
+
+def invalidate_cache() -> None:
+    """Drop all cached responses, e.g. after the underlying data changed."""
+    with _response_cache_lock:
+        _response_cache.clear()
+
+@lru_cache(maxsize=1)
 def get_config():
-    """Get configuration from environment variables."""
+    """Get configuration from environment variables, read once per process (app settings changes restart the host)."""
     return {
         'connection_string': os.environ.get('AZURE_STORAGE_CONNECTION_STRING'),
         'table_name': os.environ.get('ROFR_TABLE_NAME', 'rofrdata'),
@@ -52,6 +144,30 @@ def get_config():
 
 
 
+# Constant headers for JSON API responses (HttpResponse copies them into its own header map)
+JSON_RESPONSE_HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept-Encoding, If-None-Match'
+}
+
+# Entry columns needed for dashboard statistics; everything except the large raw_entry text
+DASHBOARD_ENTRY_FIELDS = [
+    'username', 'price_per_point', 'total_cost', 'points', 'resort', 'use_year',
+    'points_details', 'sent_date', 'result', 'result_date', 'thread_url'
+]
+
+# Entry attributes returned by get_rofr_data, in response order
+ROFR_DATA_KEYS = (
+    'username', 'resort', 'price_per_point', 'points', 'total_cost', 'use_year',
+    'points_details', 'result', 'sent_date', 'result_date', 'thread_url', 'raw_entry'
+)
+get_rofr_data_fields = attrgetter(*ROFR_DATA_KEYS)
+
+# Bodies that already fit in a single network packet gain nothing from gzip and are sent uncompressed
+COMPRESSION_MIN_BYTES = 1400
+
 def compress_response(function):
     """Decorator to compress HTTP responses."""
     @wraps(function)
@@ -64,8 +180,8 @@ def compress_response(function):
                 if 'gzip' in accept_encoding:
                     try:
                         body = response.get_body()
-                        if body:
-                            compressed_body = gzip.compress(body)
+                        if body and len(body) >= COMPRESSION_MIN_BYTES:
+                            compressed_body = gzip.compress(body, compresslevel=5)
                             if len(compressed_body) < len(body):
                                 headers = dict(response.headers) if response.headers else {}
                                 headers['Content-Encoding'] = 'gzip'
@@ -85,49 +201,213 @@ def compress_response(function):
 def create_error_response(message: str, status_code: int = 500) -> func.HttpResponse:
     """Create standardized error response."""
     return func.HttpResponse(
-        json.dumps({
+        orjson.dumps({
             'error': message,
-            'timestamp': datetime.utcnow().isoformat(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
             'status': 'error'
         }),
         status_code=status_code,
-        headers={
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept-Encoding'
-        }
+        headers=JSON_RESPONSE_HEADERS
     )
 
 def create_success_response(data, message: Optional[str] = None) -> func.HttpResponse:
     """Create standardized success response."""
     response_data = {
         'data': data,
-        'timestamp': datetime.utcnow().isoformat(),
+        'timestamp': datetime.now(timezone.utc).isoformat(),
         'status': 'success'
     }
     if message:
         response_data['message'] = message
     return func.HttpResponse(
-        json.dumps(response_data, default=str),
+        orjson.dumps(response_data, default=str, option=orjson.OPT_NON_STR_KEYS),
         status_code=200,
-        headers={
-            'Content-Type': 'application/json',
-            'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept-Encoding'
-        }
+        headers=JSON_RESPONSE_HEADERS
     )
 
+def get_distinct_values(column: str) -> List[str]:
+    """Get the sorted distinct values of an entry column, served from the response cache when fresh."""
+    cache_key = f"distinct:{column}"
+    values = cache_get(cache_key)
+    if values is None:
+        values = get_storage_manager().distinct_column(column)
+        cache_set(cache_key, values)
+    return values
+
+def parse_param(params: Mapping[str, str], key: str, conv: Callable[[str], Any], default: Any = None) -> Any:
+    """Convert a query parameter with conv, or return default when it is missing or empty."""
+    value = params.get(key)
+    return conv(value) if value else default
+
+def create_etag_response(req: func.HttpRequest, body: bytes, etag: str) -> func.HttpResponse:
+    """Create a JSON response carrying an ETag, or a bodiless 304 if the client already has it."""
+    headers = dict(JSON_RESPONSE_HEADERS)
+    headers['ETag'] = etag
+    if req.headers.get('If-None-Match') == etag:
+        return func.HttpResponse(status_code=304, headers=headers)
+    return func.HttpResponse(body, status_code=200, headers=headers)
+
+# Clients shared across invocations on a warm host so their SDK clients and connections are reused
+_storage_manager: Optional[OptimizedAzureTableStorageManager] = None
+_statistics_manager: Optional[StatisticsManager] = None
+_scraper: Optional[AzureROFRScraper] = None
+_queue_manager: Optional[ROFRQueueManager] = None
+_client_lock = threading.Lock()
+
+# Serializes statistics recalculation, which runs on the shared scraper's calculator
+_stats_calculation_lock = threading.Lock()
+
 def get_storage_manager() -> OptimizedAzureTableStorageManager:
-    """Get storage manager instance."""
-    config = get_config()
-    return OptimizedAzureTableStorageManager(config['connection_string'])
+    """Get the shared storage manager instance."""
+    global _storage_manager
+    if _storage_manager is None:
+        with _client_lock:
+            if _storage_manager is None:
+                config = get_config()
+                _storage_manager = OptimizedAzureTableStorageManager(config['connection_string'])
+    return _storage_manager
 
 def get_statistics_manager() -> StatisticsManager:
-    """Get statistics manager instance."""
-    config = get_config()
-    return StatisticsManager(config['connection_string'])
+    """Get the shared statistics manager instance."""
+    global _statistics_manager
+    if _statistics_manager is None:
+        with _client_lock:
+            if _statistics_manager is None:
+                config = get_config()
+                _statistics_manager = StatisticsManager(config['connection_string'])
+    return _statistics_manager
+
+def get_queue_manager() -> ROFRQueueManager:
+    """Get the shared queue manager instance."""
+    global _queue_manager
+    if _queue_manager is None:
+        with _client_lock:
+            if _queue_manager is None:
+                config = get_config()
+                _queue_manager = ROFRQueueManager(config['connection_string'])
+    return _queue_manager
+
+def get_scraper() -> AzureROFRScraper:
+    """Get the shared ROFR scraper instance."""
+    global _scraper
+    if _scraper is None:
+        with _client_lock:
+            if _scraper is None:
+                config = get_config()
+                _scraper = AzureROFRScraper(
+                    connection_string=config['connection_string'],
+                    table_name=config['table_name'],
+                    delay=config['delay'],
+                    max_pages=config['max_pages']
+                )
+    return _scraper
+
+# Position of the first result counter in the aggregate_price_months accumulators, indexed by ResultCodes
+PRICE_MONTH_RESULT_SLOT = 4
+
+def aggregate_price_months(columns: 'EntryColumns', rows: Iterable[int]) -> Dict[str, Dict[str, Any]]:
+    """
+    Aggregate entry count, price sum/min/max and result counts per sent month in one pass.
+
+    rows are indexes into columns of entries with a sent date and a positive price.
+    Returns the aggregates keyed by 'YYYY-MM'.
+    """
+    # Group on the integer month id (year * 12 + month - 1) and only format the 'YYYY-MM' key once per month
+    months: Dict[int, List] = {}
+    months_get = months.get
+    prices = columns.prices
+    sent_month_ids = columns.sent_month_ids
+    result_codes = columns.result_codes
+    for row in rows:
+        price = prices[row]
+        month_id = sent_month_ids[row]
+        # [total, price_sum, min_price, max_price, pending, passed, taken, unknown]
+        month = months_get(month_id)
+        if month is None:
+            month = months[month_id] = [0, 0.0, price, price, 0, 0, 0, 0]
+        month[0] += 1
+        month[1] += price
+        if price < month[2]:
+            month[2] = price
+        elif price > month[3]:
+            month[3] = price
+        month[PRICE_MONTH_RESULT_SLOT + result_codes[row]] += 1
+
+    monthly_data = {}
+    for month_id, (total, price_sum, min_price, max_price, pending, passed, taken, _) in months.items():
+        monthly_data[f"{month_id // 12:04d}-{month_id % 12 + 1:02d}"] = {
+            'total': total, 'price_sum': price_sum, 'min_price': min_price, 'max_price': max_price,
+            'taken': taken, 'passed': passed, 'pending': pending
+        }
+    return monthly_data
+
+# Columnar snapshot of the entries shared by the price trends and resort debug endpoints
+ENTRY_COLUMNS_CACHE_TTL = 300
+ENTRY_COLUMN_FIELDS = ['username', 'price_per_point', 'points', 'resort', 'sent_date', 'result', 'result_date', 'use_year']
+
+class EntryColumns:
+    """
+    Column-oriented copy of every entry, ordered newest sent_date first.
+
+    Each field lives in its own array or list, so scans touch compact columns instead of
+    ROFREntry objects, and entries older than a cutoff always form the tail of the columns.
+    """
+
+    __slots__ = ('prices', 'points', 'sent_date_ords', 'sent_month_ids', 'result_codes', 'unknown_results',
+                 'resort_ids', 'resort_codes', 'resort_index', 'usernames', 'result_dates', 'use_years')
+
+    def __init__(self, entries: Iterable[ROFREntry]):
+        ordered = sorted(entries, key=lambda e: e.sent_date or date.min, reverse=True)
+        # Missing prices are stored as NaN, which fails every price comparison
+        self.prices = array('d', [nan if e.price_per_point is None else e.price_per_point for e in ordered])
+        self.points = [e.points for e in ordered]
+        # Sent dates as day ordinals (0 when missing) plus their year * 12 + month - 1 month ids
+        self.sent_date_ords = array('l', [e.sent_date.toordinal() if e.sent_date else 0 for e in ordered])
+        self.sent_month_ids = array('l', [e.sent_date.year * 12 + e.sent_date.month - 1 if e.sent_date else 0
+                                          for e in ordered])
+        self.result_codes = array('B', [ResultCodes.encode(e.result) for e in ordered])
+        # The stored result of rows encoded as UNKNOWN, keyed by row
+        self.unknown_results = {row: ordered[row].result for row, code in enumerate(self.result_codes)
+                                if code == ResultCodes.UNKNOWN}
+        # Dictionary-encode the low-cardinality resort column: known codes first, then any others seen
+        self.resort_codes = list(ResortCodes.RESORTS)
+        self.resort_index = {code: resort_id for resort_id, code in enumerate(self.resort_codes)}
+        resort_ids = array('H')
+        for e in ordered:
+            resort_id = self.resort_index.get(e.resort)
+            if resort_id is None:
+                resort_id = self.resort_index[e.resort] = len(self.resort_codes)
+                self.resort_codes.append(e.resort)
+            resort_ids.append(resort_id)
+        self.resort_ids = resort_ids
+        self.usernames = [e.username for e in ordered]
+        self.result_dates = [e.result_date for e in ordered]
+        self.use_years = [e.use_year for e in ordered]
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    def price(self, row: int) -> Optional[float]:
+        """Get the price per point of a row, None when it is missing."""
+        price = self.prices[row]
+        return None if isnan(price) else price
+
+    def result(self, row: int) -> Optional[str]:
+        """Get the result string of a row as stored."""
+        code = self.result_codes[row]
+        if code == ResultCodes.UNKNOWN:
+            return self.unknown_results[row]
+        return ResultCodes.NAMES[code]
+
+def get_entry_columns() -> EntryColumns:
+    """Get the columnar entry snapshot, rebuilding it from storage once it is older than its TTL."""
+    columns = cache_get('entry_columns', ttl=ENTRY_COLUMNS_CACHE_TTL)
+    if columns is None:
+        storage = get_storage_manager()
+        columns = EntryColumns(storage.iter_entries_optimized(fields=ENTRY_COLUMN_FIELDS))
+        logger.info(f"Built columnar entry cache with {len(columns)} entries")
+        cache_set('entry_columns', columns)
+    return columns
 
 class CompleteThreadProcessor:
     """Process an entire thread (all pages) in a single function execution."""
@@ -141,23 +421,24 @@ class CompleteThreadProcessor:
         self.batch_size = config.get('batch_size', 200)
         self.chunk_size = config.get('chunk_size', 50)
         self.delay_between_requests = config.get('delay', 0.05)
+        # Adaptive pacing: no delay until the forum throttles us, then back off and recover
+        self._request_delay = 0.0
+        self.max_request_delay = 5.0
         self.max_retries = config.get('max_retries', 3)
+        # Persist thread progress every N chunks; the final state is always written after the loop
+        self.thread_upsert_interval = config.get('thread_upsert_interval', 5)
         self.parsing_utils = ROFRParsingUtils()
+        self._total_pages_cache: Dict[str, int] = {}
 
     async def initialize_session(self):
         """Initialize async HTTP session with optimized settings."""
         if not self.session:
             timeout = aiohttp.ClientTimeout(total=30, connect=10)
-            connector = aiohttp.TCPConnector(
-                limit=50,
-                limit_per_host=20,
-                ttl_dns_cache=300,
-                use_dns_cache=True,
-                keepalive_timeout=30
-            )
+            # Reuse the worker-wide pool so keep-alive connections survive between threads
             self.session = aiohttp.ClientSession(
                 timeout=timeout,
-                connector=connector,
+                connector=get_shared_connector(),
+                connector_owner=False,
                 headers={
                     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
                 }
@@ -175,64 +456,88 @@ class CompleteThreadProcessor:
             if not self.session:
                 await self.initialize_session()
 
-            async with self.session.get(thread_url) as response:
+            # Pagination is rendered near the top of the page, so try a small ranged read first
+            html_bytes = None
+            async with self.session.get(thread_url, headers={'Range': f'bytes=0-{PAGE_NAV_PROBE_BYTES - 1}'}) as response:
                 response.raise_for_status()
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-
-                # Try multiple approaches to find pagination
-                total_pages = 1
-
-                # Approach 1: pageNavWrapper with data-page attributes
-                page_nav = soup.find('nav', class_='pageNavWrapper')
-                if page_nav and hasattr(page_nav, 'find_all'):
-                    page_links = page_nav.find_all('a', {'data-page': True})
-                    if page_links:
-                        total_pages = max(int(link.get('data-page', 1)) for link in page_links)
-                        logger.debug(f"Found {total_pages} pages using pageNavWrapper data-page")
-                        return total_pages
-
-                    page_text = page_nav.get_text()
-                    numbers = re.findall(r'Page \d+ of (\d+)', page_text)
-                    if numbers:
-                        total_pages = int(numbers[0])
-                        logger.debug(f"Found {total_pages} pages using pageNavWrapper regex")
-                        return total_pages
-
-                # Approach 2: pageNav-main with text parsing (like AzureROFRScraper)
-                page_nav = soup.select_one('.pageNav-main')
-                if page_nav and hasattr(page_nav, 'select'):
-                    page_links = page_nav.select('a')
-                    if page_links:
-                        try:
-                            page_numbers = []
-                            for link in page_links:
-                                text = link.get_text().strip()
-                                if text.isdigit():
-                                    page_numbers.append(int(text))
-                            if page_numbers:
-                                total_pages = max(page_numbers)
-                                logger.debug(f"Found {total_pages} pages using pageNav-main text parsing")
-                                return total_pages
-                        except (ValueError, TypeError):
-                            pass
-
-                # Approach 3: Look for any pagination indicators
-                page_indicators = soup.find_all(text=re.compile(r'Page \d+ of (\d+)'))
-                for indicator in page_indicators:
-                    numbers = re.findall(r'Page \d+ of (\d+)', indicator)
-                    if numbers:
-                        total_pages = int(numbers[0])
-                        logger.debug(f"Found {total_pages} pages using text indicator")
-                        return total_pages
-
-                logger.debug(f"No pagination found, assuming single page for {thread_url}")
-                return 1
+                probe_bytes = await response.read()
+                data_pages = _DATA_PAGE_RE.findall(probe_bytes)
+                if data_pages:
+                    total_pages = max(int(page) for page in data_pages)
+                    logger.debug(f"Found {total_pages} pages in the first {len(probe_bytes)} bytes")
+                    return total_pages
+                if response.status != 206:
+                    # Server ignored the Range header and already sent the whole page
+                    html_bytes = probe_bytes
+
+            if html_bytes is None:
+                async with self.session.get(thread_url) as response:
+                    response.raise_for_status()
+                    html_bytes = await response.read()
+
+            # Fast path: pull the page count out of the raw HTML without building a tree
+            total_pages = self._extract_total_pages_from_bytes(html_bytes)
+            if total_pages > 0:
+                logger.debug(f"Found {total_pages} pages using raw HTML regex")
+                return total_pages
+
+            # Fall back to parsing the pagination widget
+            html = html_bytes.decode('utf-8', errors='replace')
+            soup = BeautifulSoup(html, HTML_PARSER, parse_only=PAGE_NAV_STRAINER)
+
+            # Try multiple approaches to find pagination
+            total_pages = 1
+
+            # Approach 1: pageNavWrapper with data-page attributes
+            page_nav = soup.find('nav', class_='pageNavWrapper')
+            if page_nav and hasattr(page_nav, 'find_all'):
+                page_links = page_nav.find_all('a', {'data-page': True})
+                if page_links:
+                    total_pages = max(int(link.get('data-page', 1)) for link in page_links)
+                    logger.debug(f"Found {total_pages} pages using pageNavWrapper data-page")
+                    return total_pages
+
+                page_text = page_nav.get_text()
+                numbers = _PAGE_OF_TEXT_RE.findall(page_text)
+                if numbers:
+                    total_pages = int(numbers[0])
+                    logger.debug(f"Found {total_pages} pages using pageNavWrapper regex")
+                    return total_pages
+
+            # Approach 2: pageNav-main with text parsing (like AzureROFRScraper)
+            page_nav = soup.select_one('.pageNav-main')
+            if page_nav and hasattr(page_nav, 'select'):
+                page_links = page_nav.select('a')
+                if page_links:
+                    try:
+                        page_numbers = []
+                        for link in page_links:
+                            text = link.get_text().strip()
+                            if text.isdigit():
+                                page_numbers.append(int(text))
+                        if page_numbers:
+                            total_pages = max(page_numbers)
+                            logger.debug(f"Found {total_pages} pages using pageNav-main text parsing")
+                            return total_pages
+                    except (ValueError, TypeError):
+                        pass
+
+            # Approach 3: Look for any pagination indicators
+            page_indicators = soup.find_all(string=_PAGE_OF_TEXT_RE)
+            for indicator in page_indicators:
+                numbers = _PAGE_OF_TEXT_RE.findall(indicator)
+                if numbers:
+                    total_pages = int(numbers[0])
+                    logger.debug(f"Found {total_pages} pages using text indicator")
+                    return total_pages
+
+            logger.debug(f"No pagination found, assuming single page for {thread_url}")
+            return 1
         except Exception as e:
             logger.error(f"Error getting total pages for {thread_url}: {e}")
             return 1
 
-    async def scrape_page_content(self, thread_url: str, page_number: int) -> Tuple[str, int]:
+    async def scrape_page_content(self, thread_url: str, page_number: int) -> Tuple[bytes, int]:
         """Scrape content from a single page."""
         if not self.session:
             await self.initialize_session()
@@ -241,14 +546,38 @@ class CompleteThreadProcessor:
 
         for attempt in range(self.max_retries):
             try:
-                await asyncio.sleep(self.delay_between_requests)
+                if self._request_delay > 0:
+                    await asyncio.sleep(self._request_delay)
 
                 async with self.session.get(page_url) as response:
+                    if response.status in (429, 503):
+                        # Throttled: double the delay (starting from the configured delay)
+                        self._request_delay = min(
+                            max(self._request_delay * 2, self.delay_between_requests),
+                            self.max_request_delay
+                        )
+                        logger.warning(f"Throttled with HTTP {response.status}, request delay now {self._request_delay:.2f}s")
                     response.raise_for_status()
-                    html_content = await response.text()
 
-                    soup = BeautifulSoup(html_content, 'html.parser')
-                    total_pages = self._extract_total_pages_from_soup(soup)
+                    # Successful request: ease the delay back toward zero
+                    if self._request_delay > 0:
+                        self._request_delay = self._request_delay / 2 if self._request_delay > 0.01 else 0.0
+
+                    # Keep the raw bytes; the parsers decode them once as UTF-8
+                    html_content = await response.read()
+
+                    # Page count is already known for this thread, skip re-parsing pagination
+                    cached_total = self._total_pages_cache.get(thread_url)
+                    if cached_total:
+                        return html_content, cached_total
+
+                    total_pages = self._extract_total_pages_from_bytes(html_content)
+                    if total_pages == 0:
+                        soup = BeautifulSoup(html_content, HTML_PARSER, parse_only=PAGE_NAV_STRAINER,
+                                             from_encoding='utf-8')
+                        total_pages = self._extract_total_pages_from_soup(soup)
+                    if total_pages > 0:
+                        self._total_pages_cache[thread_url] = total_pages
 
                     return html_content, total_pages
 
@@ -258,7 +587,18 @@ class CompleteThreadProcessor:
                     await asyncio.sleep(2 ** attempt)
                 else:
                     logger.error(f"Failed to scrape page {page_number} after {self.max_retries} attempts")
-                    return "", 0
+                    return b"", 0
+
+    def _extract_total_pages_from_bytes(self, html_bytes: bytes) -> int:
+        """Extract total pages from raw HTML with the precompiled patterns, or 0 if not found."""
+        data_pages = _DATA_PAGE_RE.findall(html_bytes)
+        if data_pages:
+            return max(int(page) for page in data_pages)
+
+        page_of_match = _PAGE_OF_RE.search(html_bytes)
+        if page_of_match:
+            return int(page_of_match.group(1))
+        return 0
 
     def _extract_total_pages_from_soup(self, soup: BeautifulSoup) -> int:
         """Extract total pages from BeautifulSoup object."""
@@ -271,7 +611,7 @@ class CompleteThreadProcessor:
                     return max(int(link.get('data-page', 1)) for link in page_links)
 
                 page_text = page_nav.get_text()
-                numbers = re.findall(r'Page \d+ of (\d+)', page_text)
+                numbers = _PAGE_OF_TEXT_RE.findall(page_text)
                 if numbers:
                     return int(numbers[0])
 
@@ -292,9 +632,9 @@ class CompleteThreadProcessor:
                         pass
 
             # Approach 3: Look for any pagination indicators in text
-            page_indicators = soup.find_all(text=re.compile(r'Page \d+ of (\d+)'))
+            page_indicators = soup.find_all(string=_PAGE_OF_TEXT_RE)
             for indicator in page_indicators:
-                numbers = re.findall(r'Page \d+ of (\d+)', indicator)
+                numbers = _PAGE_OF_TEXT_RE.findall(indicator)
                 if numbers:
                     return int(numbers[0])
 
@@ -302,7 +642,7 @@ class CompleteThreadProcessor:
             pass
         return 0
 
-    def parse_rofr_entries_from_html(self, html_content: str, thread_info: ThreadInfo, page_number: int) -> List[ROFREntry]:
+    def parse_rofr_entries_from_html(self, html_content: bytes, thread_info: ThreadInfo, page_number: int) -> List[ROFREntry]:
         """Parse ROFR entries from HTML content."""
         return self.parsing_utils.parse_rofr_entries_from_html(
             html_content, thread_info, page_number
@@ -333,17 +673,28 @@ class CompleteThreadProcessor:
         """Process a chunk of pages concurrently."""
         logger.info(f"Processing pages {page_numbers[0]}-{page_numbers[-1]} for thread: {thread_info.title}")
 
-        scrape_tasks = [
-            self.scrape_page_content(thread_info.url, page_num)
-            for page_num in page_numbers
-        ]
+        loop = asyncio.get_running_loop()
+        parse_pool = get_parse_pool()
 
-        scrape_results = await asyncio.gather(*scrape_tasks, return_exceptions=True)
+        async def scrape_and_parse(page_number: int) -> Tuple[Optional[List[ROFREntry]], int]:
+            html_content, total_pages = await self.scrape_page_content(thread_info.url, page_number)
+            if not html_content:
+                return None, total_pages
+            # Parse in the worker pool as soon as the page arrives so the other downloads keep flowing
+            page_entries = await loop.run_in_executor(
+                parse_pool, parse_page_entries, html_content, thread_info, page_number
+            )
+            return page_entries, total_pages
+
+        page_results = await asyncio.gather(
+            *(scrape_and_parse(page_num) for page_num in page_numbers),
+            return_exceptions=True
+        )
 
         all_entries = []
         stats = {'pages_processed': 0, 'pages_failed': 0, 'total_pages': 0}
 
-        for i, result in enumerate(scrape_results):
+        for i, result in enumerate(page_results):
             page_number = page_numbers[i]
 
             if isinstance(result, Exception):
@@ -351,12 +702,11 @@ class CompleteThreadProcessor:
                 stats['pages_failed'] += 1
                 continue
 
-            html_content, total_pages = result
+            page_entries, total_pages = result
             if total_pages > 0:
                 stats['total_pages'] = max(stats['total_pages'], total_pages)
 
-            if html_content:
-                page_entries = self.parse_rofr_entries_from_html(html_content, thread_info, page_number)
+            if page_entries is not None:
                 all_entries.extend(page_entries)
                 stats['pages_processed'] += 1
 
@@ -366,16 +716,40 @@ class CompleteThreadProcessor:
 
         return all_entries, stats
 
-    async def process_complete_thread(self, thread_info: ThreadInfo, session_id: str) -> Dict[str, Any]:
+    def _stale_thread_result(self, thread_info: ThreadInfo, total_pages: Optional[int]) -> Dict[str, Any]:
+        """Build the processing result for a thread skipped as completed and old."""
+        return {
+            'success': True,
+            'skipped': True,
+            'reason': 'completed_and_old',
+            'thread_title': thread_info.title,
+            'total_pages': total_pages,
+            'pages_processed': 0,
+            'pages_failed': 0,
+            'entries_found': 0,
+            'new_entries': 0,
+            'updated_entries': 0,
+            'processing_time': 0
+        }
+
+    async def process_complete_thread(self, thread_info: ThreadInfo, session_id: str,
+                                      existing_threads: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """Process all pages of a thread in a single execution with optimizations."""
         logger.info(f"Starting complete thread processing: {thread_info.title}")
         processing_start = time.time()
 
+        if thread_info.url in _stale_threads:
+            logger.info(f"Skipping thread '{thread_info.title}' - known completed and older than 90 days")
+            return self._stale_thread_result(thread_info, _stale_threads[thread_info.url])
+
         await self.initialize_session()
 
         try:
-            # Get existing thread info from storage to check current state
-            existing_thread_data = self.storage.get_thread_info(thread_info.url)
+            # Get existing thread info to check current state, using the prefetched rows when provided
+            if existing_threads is not None:
+                existing_thread_data = existing_threads.get(thread_info.url)
+            else:
+                existing_thread_data = self.storage.get_thread_info(thread_info.url)
             if existing_thread_data:
                 existing_thread = ThreadInfo.from_table_entity(existing_thread_data)
 
@@ -389,19 +763,8 @@ class CompleteThreadProcessor:
 
                     logger.info(f"Skipping thread '{thread_info.title}' - completed and older than 90 days "
                                f"(ended {existing_thread.thread_end_date}, last scraped page {existing_thread.last_scraped_page}/{existing_thread.total_pages})")
-                    return {
-                        'success': True,
-                        'skipped': True,
-                        'reason': 'completed_and_old',
-                        'thread_title': thread_info.title,
-                        'total_pages': existing_thread.total_pages,
-                        'pages_processed': 0,
-                        'pages_failed': 0,
-                        'entries_found': 0,
-                        'new_entries': 0,
-                        'updated_entries': 0,
-                        'processing_time': 0
-                    }
+                    _stale_threads[thread_info.url] = existing_thread.total_pages
+                    return self._stale_thread_result(thread_info, existing_thread.total_pages)
 
                 # Update thread_info with existing values
                 if existing_thread.last_scraped_page:
@@ -417,6 +780,7 @@ class CompleteThreadProcessor:
                 return {'success': False, 'error': 'Could not determine total pages'}
 
             thread_info.total_pages = total_pages
+            self._total_pages_cache[thread_info.url] = total_pages
             self.storage.safe_upsert_thread(thread_info)
 
             # Determine start page based on last_scraped_page
@@ -479,17 +843,19 @@ class CompleteThreadProcessor:
                     self.storage.update_thread_progress_batch(
                         session_id=session_id,
                         thread_url=thread_info.url,
-                        current_page=str(page_chunk[-1]),
-                        pages_processed=str(total_stats['pages_processed']),
-                        entries_found=str(total_stats['entries_found']),
-                        new_entries=str(total_stats['new_entries']),
-                        updated_entries=str(total_stats['updated_entries']),
+                        current_page=page_chunk[-1],
+                        pages_processed=total_stats['pages_processed'],
+                        entries_found=total_stats['entries_found'],
+                        new_entries=total_stats['new_entries'],
+                        updated_entries=total_stats['updated_entries'],
                         status=f'processing_{progress_percentage:.1f}%'
                     )
 
-                    # Update thread info with last scraped page
+                    # Update thread info with last scraped page, writing it (and buffered progress) through periodically
                     thread_info.last_scraped_page = page_chunk[-1]
-                    self.storage.safe_upsert_thread(thread_info)
+                    if (chunk_idx + 1) % self.thread_upsert_interval == 0:
+                        self.storage.flush_thread_progress()
+                        self.storage.safe_upsert_thread(thread_info)
 
                     chunk_time = time.time() - chunk_start
                     logger.info(f"Chunk {chunk_idx + 1}/{len(page_chunks)} completed in {chunk_time:.2f}s: "
@@ -505,13 +871,14 @@ class CompleteThreadProcessor:
             self.storage.update_thread_progress_batch(
                 session_id=session_id,
                 thread_url=thread_info.url,
-                current_page=str(total_pages),
-                pages_processed=str(total_stats['pages_processed']),
-                entries_found=str(total_stats['entries_found']),
-                new_entries=str(total_stats['new_entries']),
-                updated_entries=str(total_stats['updated_entries']),
+                current_page=total_pages,
+                pages_processed=total_stats['pages_processed'],
+                entries_found=total_stats['entries_found'],
+                new_entries=total_stats['new_entries'],
+                updated_entries=total_stats['updated_entries'],
                 status='completed'
             )
+            self.storage.flush_thread_progress()
 
             # Mark thread as completed with final page count
             thread_info.last_scraped_page = total_pages
@@ -534,6 +901,8 @@ class CompleteThreadProcessor:
             }
 
         finally:
+            # Don't lose progress buffered before an error
+            self.storage.flush_thread_progress()
             await self.close_session()
 
 # Timer-triggered function
@@ -547,12 +916,7 @@ async def scrape_rofr_timer(myTimer: func.TimerRequest) -> None:
         logger.info("Starting scheduled ROFR scrape with inline thread processing")
 
         config = get_config()
-        scraper = AzureROFRScraper(
-            connection_string=config['connection_string'],
-            table_name=config['table_name'],
-            delay=config['delay'],
-            max_pages=config['max_pages']
-        )
+        scraper = get_scraper()
 
         current_thread_url = scraper.get_current_thread_url()
         if not current_thread_url:
@@ -570,22 +934,21 @@ async def scrape_rofr_timer(myTimer: func.TimerRequest) -> None:
         total_threads = len(thread_infos)
 
         # Update session metadata
-        import json
-        pending_threads = []
-        for thread_info in thread_infos:
-            thread_dict = {
+        pending_threads = [
+            {
                 'url': thread_info.url,
                 'title': thread_info.title,
                 'start_year': thread_info.start_year,
                 'end_year': thread_info.end_year
             }
-            pending_threads.append(thread_dict)
+            for thread_info in thread_infos
+        ]
 
         scraper.storage.update_session_metadata(
             session_id,
             total_threads=total_threads,
             status='processing',
-            pending_threads=json.dumps(pending_threads),
+            pending_threads=orjson.dumps(pending_threads).decode('utf-8'),
             current_thread_index=0
         )
 
@@ -593,6 +956,10 @@ async def scrape_rofr_timer(myTimer: func.TimerRequest) -> None:
         processor = CompleteThreadProcessor(config)
         await processor.initialize_session()
 
+        # Load stored state for every discovered thread in one query instead of one per thread
+        urls_to_check = [t.url for t in thread_infos if t.url and t.url not in _stale_threads]
+        existing_threads = processor.storage.get_thread_infos_batch(urls_to_check) if urls_to_check else {}
+
         total_stats = {
             'threads_processed': 0,
             'threads_failed': 0,
@@ -623,7 +990,7 @@ async def scrape_rofr_timer(myTimer: func.TimerRequest) -> None:
 
                 try:
                     # Process the complete thread
-                    result = await processor.process_complete_thread(thread_info, session_id)
+                    result = await processor.process_complete_thread(thread_info, session_id, existing_threads)
 
                     if result['success']:
                         total_stats['threads_processed'] += 1
@@ -678,7 +1045,7 @@ async def scrape_rofr_timer(myTimer: func.TimerRequest) -> None:
 
         # Trigger statistics update
         try:
-            queue_manager = ROFRQueueManager(config['connection_string'])
+            queue_manager = get_queue_manager()
             queue_manager.add_stats_update_task(f"timer_scrape_{session_id}")
         except Exception as e:
             logger.error(f"Error triggering stats update: {e}")
@@ -703,17 +1070,12 @@ def update_statistics_task(msg: func.QueueMessage) -> None:
     try:
         logger.info("Processing statistics update task from queue trigger")
 
-        config = get_config()
-
-        scraper = AzureROFRScraper(
-            connection_string=config['connection_string'],
-            table_name=config['table_name'],
-            delay=config['delay'],
-            max_pages=config['max_pages']
-        )
+        scraper = get_scraper()
 
         logger.info("Recalculating statistics from Azure storage entries table")
-        stats_result = scraper._calculate_and_store_statistics()
+        with _stats_calculation_lock:
+            stats_result = scraper._calculate_and_store_statistics()
+        invalidate_cache()
 
         logger.info(f"Statistics recalculation completed. Result: {stats_result}")
     except Exception as e:
@@ -756,18 +1118,18 @@ def get_rofr_data(req: func.HttpRequest) -> func.HttpResponse:
         end_date = req.params.get('end_date')
 
         # Numeric filters
-        min_price = float(req.params.get('min_price')) if req.params.get('min_price') else None
-        max_price = float(req.params.get('max_price')) if req.params.get('max_price') else None
-        min_points = int(req.params.get('min_points')) if req.params.get('min_points') else None
-        max_points = int(req.params.get('max_points')) if req.params.get('max_points') else None
-        min_total_cost = float(req.params.get('min_total_cost')) if req.params.get('min_total_cost') else None
+        min_price = parse_param(req.params, 'min_price', float)
+        max_price = parse_param(req.params, 'max_price', float)
+        min_points = parse_param(req.params, 'min_points', int)
+        max_points = parse_param(req.params, 'max_points', int)
+        min_total_cost = parse_param(req.params, 'min_total_cost', float)
 
         # Other filters
         exclude_result = req.params.get('exclude_result')
 
         # Pagination and sorting
-        limit = min(int(req.params.get('limit', '1000')), 10000)
-        offset = int(req.params.get('offset', '0'))
+        limit = min(parse_param(req.params, 'limit', int, 1000), 10000)
+        offset = parse_param(req.params, 'offset', int, 0)
         sort_by = req.params.get('sort_by', 'sent_date')
         sort_order = req.params.get('sort_order', 'desc')
 
@@ -806,23 +1168,8 @@ def get_rofr_data(req: func.HttpRequest) -> func.HttpResponse:
             limit=limit
         )
 
-        # Convert to response format
-        data = []
-        for entry in entries:
-            data.append({
-                'username': entry.username,
-                'resort': entry.resort,
-                'price_per_point': entry.price_per_point,
-                'points': entry.points,
-                'total_cost': entry.total_cost,
-                'use_year': entry.use_year,
-                'points_details': entry.points_details,
-                'result': entry.result,
-                'sent_date': entry.sent_date.isoformat() if entry.sent_date else None,
-                'result_date': entry.result_date.isoformat() if entry.result_date else None,
-                'thread_url': entry.thread_url,
-                'raw_entry': entry.raw_entry
-            })
+        # Convert to response format (orjson serializes the date fields natively)
+        data = [dict(zip(ROFR_DATA_KEYS, get_rofr_data_fields(entry), strict=True)) for entry in entries]
 
         return create_success_response({
             'entries': data,
@@ -858,16 +1205,7 @@ def get_rofr_data(req: func.HttpRequest) -> func.HttpResponse:
 def get_resorts(req: func.HttpRequest) -> func.HttpResponse:
     """Get list of available resorts."""
     try:
-        storage = get_storage_manager()
-
-        # Get unique resorts from the entries
-        entries = storage.query_entries_optimized(limit=10000)
-        resorts = set()
-        for entry in entries:
-            if entry.resort:
-                resorts.add(entry.resort)
-
-        resort_list = sorted(list(resorts))
+        resort_list = get_distinct_values('resort')
 
         return create_success_response(resort_list)
 
@@ -881,16 +1219,7 @@ def get_resorts(req: func.HttpRequest) -> func.HttpResponse:
 def get_usernames(req: func.HttpRequest) -> func.HttpResponse:
     """Get list of available usernames."""
     try:
-        storage = get_storage_manager()
-
-        # Get unique usernames from the entries
-        entries = storage.query_entries_optimized(limit=10000)
-        usernames = set()
-        for entry in entries:
-            if entry.username and entry.username.strip():
-                usernames.add(entry.username.strip())
-
-        username_list = sorted(list(usernames))
+        username_list = get_distinct_values('username')
 
         return create_success_response(username_list)
 
@@ -937,30 +1266,29 @@ def get_dashboard_data(req: func.HttpRequest) -> func.HttpResponse:
         else:
             logger.info(f"Using validated time range: '{time_range}'")
 
+        # Serve a recently built response for this time range when one is cached
+        cache_key = f"dashboard:{time_range}"
+        cached = cache_get(cache_key, ttl=DASHBOARD_CACHE_TTL)
+        if cached is not None:
+            return create_etag_response(req, *cached)
+
         storage = get_storage_manager()
 
-        # Get all entries for statistics calculation
-        all_entries = storage.query_entries_optimized(limit=None)
+        # Stream entries through the calculator: filter, collect resorts and calculate statistics in a single pass
+        calc = StatisticsCalculator()
+        entries = storage.iter_entries_optimized(fields=DASHBOARD_ENTRY_FIELDS)
+        resorts, all_stats = calc.calculate_all_statistics_fused(entries, time_range)
 
-        if not all_entries:
+        if 'error' in all_stats:
+            return create_error_response("Internal server error")
+
+        if all_stats.get('original_entries_count', 0) == 0:
             logger.warning("No entries found for dashboard data")
             return create_error_response("No data available", 404)
 
-        # Calculate filtered statistics
-        from statistics_calculator import StatisticsCalculator
-        calc = StatisticsCalculator()
-        all_stats = calc.calculate_all_statistics(all_entries, time_range)
-
         global_stats = all_stats['global']
         monthly_stats = all_stats['monthly']
 
-        # Get resort data from filtered entries
-        filtered_entries = calc._filter_entries_by_time_range(all_entries, time_range)
-        resorts = set()
-        for entry in filtered_entries:
-            if entry.resort:
-                resorts.add(entry.resort)
-
         # Fix last_updated field mapping
         if 'latest_entry_date' in global_stats and global_stats['latest_entry_date']:
             global_stats['last_updated'] = global_stats['latest_entry_date']
@@ -997,11 +1325,11 @@ def get_dashboard_data(req: func.HttpRequest) -> func.HttpResponse:
         dashboard_data = {
             'global_stats': global_stats,
             'monthly_stats': monthly_stats,
-            'recent_entries_count': len(filtered_entries),
+            'recent_entries_count': all_stats['total_entries_processed'],
             'resort_count': len(resorts),
-            'top_resorts': sorted(list(resorts))[:10],
+            'top_resorts': heapq.nsmallest(10, resorts),
             'time_range': time_range,
-            'total_entries_available': len(all_entries)
+            'total_entries_available': all_stats['original_entries_count']
         }
 
         # Add debug logging for troubleshooting
@@ -1009,7 +1337,11 @@ def get_dashboard_data(req: func.HttpRequest) -> func.HttpResponse:
         logger.info(f"Monthly stats count: {len(monthly_stats)}")
         logger.info(f"Last updated field: {global_stats.get('last_updated', 'NOT FOUND')}")
 
-        return create_success_response(dashboard_data)
+        body = create_success_response(dashboard_data).get_body()
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        cache_set(cache_key, (body, etag))
+
+        return create_etag_response(req, body, etag)
 
     except Exception as e:
         logger.error(f"Error in get_dashboard_data: {str(e)}", exc_info=True)
@@ -1033,7 +1365,8 @@ def get_rofr_analytics(req: func.HttpRequest) -> func.HttpResponse:
         entries = storage.query_entries_optimized(
             resort=resort,
             result=result,
-            limit=5000
+            limit=5000,
+            fields=['username', 'resort', 'price_per_point', 'points', 'result', 'sent_date', 'result_date']
         )
 
         if not entries:
@@ -1043,23 +1376,31 @@ def get_rofr_analytics(req: func.HttpRequest) -> func.HttpResponse:
                 'filters': {'resort': resort, 'result': result, 'months': months}
             })
 
-        # Calculate analytics
+        # Calculate analytics in a single pass over the entries
         total_entries = len(entries)
-        total_points = sum(entry.points for entry in entries if entry.points)
-        avg_price = sum(entry.price_per_point for entry in entries if entry.price_per_point) / total_entries if total_entries > 0 else 0
-
-        # Group by result
+        total_points = 0
+        price_sum = 0.0
+        price_min = None
+        price_max = None
         result_counts = {}
+        resort_counts = {}
         for entry in entries:
+            if entry.points:
+                total_points += entry.points
+            price = entry.price_per_point
+            if price:
+                price_sum += price
+                if price_min is None or price < price_min:
+                    price_min = price
+                if price_max is None or price > price_max:
+                    price_max = price
             result_key = entry.result or 'unknown'
             result_counts[result_key] = result_counts.get(result_key, 0) + 1
-
-        # Group by resort
-        resort_counts = {}
-        for entry in entries:
             resort_key = entry.resort or 'unknown'
             resort_counts[resort_key] = resort_counts.get(resort_key, 0) + 1
 
+        avg_price = price_sum / total_entries if total_entries > 0 else 0
+
         analytics = {
             'total_entries': total_entries,
             'total_points': total_points,
@@ -1067,8 +1408,8 @@ def get_rofr_analytics(req: func.HttpRequest) -> func.HttpResponse:
             'result_breakdown': result_counts,
             'resort_breakdown': resort_counts,
             'price_range': {
-                'min': min(entry.price_per_point for entry in entries if entry.price_per_point) if entries else 0,
-                'max': max(entry.price_per_point for entry in entries if entry.price_per_point) if entries else 0
+                'min': price_min if price_min is not None else 0,
+                'max': price_max if price_max is not None else 0
             }
         }
 
@@ -1104,8 +1445,7 @@ def trigger_stats_calculation(req: func.HttpRequest) -> func.HttpResponse:
     try:
         logger.info("Manual statistics calculation trigger requested")
 
-        config = get_config()
-        queue_manager = ROFRQueueManager(config['connection_string'])
+        queue_manager = get_queue_manager()
 
         success = queue_manager.add_stats_update_task("manual_trigger")
 
@@ -1135,16 +1475,12 @@ def trigger_stats_calculation_immediate(req: func.HttpRequest) -> func.HttpRespo
     try:
         logger.info("Immediate statistics calculation triggered")
 
-        config = get_config()
-        scraper = AzureROFRScraper(
-            connection_string=config['connection_string'],
-            table_name=config['table_name'],
-            delay=config['delay'],
-            max_pages=config['max_pages']
-        )
+        scraper = get_scraper()
 
         # Calculate and store statistics
-        stats_result = scraper._calculate_and_store_statistics()
+        with _stats_calculation_lock:
+            stats_result = scraper._calculate_and_store_statistics()
+        invalidate_cache()
 
         return create_success_response({
             'statistics_updated': stats_result,
@@ -1165,18 +1501,27 @@ def debug_data(req: func.HttpRequest) -> func.HttpResponse:
         storage = get_storage_manager()
         entries = storage.query_entries_optimized(limit=100)
 
-        # Check BWV entries specifically
-        bwv_entries = [e for e in entries if e.resort == "BWV"]
+        # Check BWV entries specifically, counting raw entry data and sampling resorts in the same pass
+        bwv_entries = []
+        sample_resorts = set()
+        entries_with_raw_data = 0
+        for index, e in enumerate(entries):
+            if e.resort == "BWV":
+                bwv_entries.append(e)
+            if index < 20:
+                sample_resorts.add(e.resort)
+            if e.raw_entry:
+                entries_with_raw_data += 1
 
         debug_info = {
             'total_entries': len(entries),
             'bwv_entries': len(bwv_entries),
-            'sample_resorts': list(set([e.resort for e in entries[:20]])),
+            'sample_resorts': list(sample_resorts),
             'sample_bwv_prices': [e.price_per_point for e in bwv_entries[:5]],
             'sample_bwv_dates': [e.sent_date.isoformat() if e.sent_date else None for e in bwv_entries[:5]],
             'raw_entry_samples': [e.raw_entry for e in entries[:5]],
             'raw_entry_lengths': [len(e.raw_entry) if e.raw_entry else 0 for e in entries[:5]],
-            'entries_with_raw_data': len([e for e in entries if e.raw_entry])
+            'entries_with_raw_data': entries_with_raw_data
         }
 
         return create_success_response(debug_info)
@@ -1201,194 +1546,118 @@ def get_price_trends_analysis(req: func.HttpRequest) -> func.HttpResponse:
 
         logger.info(f"Price trends analysis requested: timeRange={time_range}, minPrice={min_price}, maxPrice={max_price}, resort={resort}")
 
-        # Get storage manager and fetch data
-        storage = get_storage_manager()
+        response_cache_key = f"price_trends_response:{time_range}:{min_price}:{max_price}:{resort}"
+        cached_response = cache_get(response_cache_key)
+        if cached_response is not None:
+            return create_success_response(cached_response)
 
         # Get entries for the specified time range (in months)
-        from datetime import datetime, timedelta
-        cutoff_date = datetime.now().date() - timedelta(days=time_range * 30)
-
-        entries = storage.query_entries_optimized(
-            limit=10000,
-            sort_by='sent_date',
-            sort_order='desc'
-        )
-
-        logger.info(f"Retrieved {len(entries)} total entries from storage")
-
-        # Debug: Check a few sample entries
-        if entries:
-            sample_entry = entries[0]
-            logger.info(f"Sample entry: resort='{sample_entry.resort}', price_per_point={sample_entry.price_per_point}, sent_date={sample_entry.sent_date}")
-
-        # Filter entries by date, price range, and resort
-        filtered_entries = []
-        date_filtered = 0
-        price_filtered = 0
-        resort_filtered = 0
-
-        for entry in entries:
-            # Check date filter
-            if not entry.sent_date or entry.sent_date < cutoff_date:
-                date_filtered += 1
-                continue
-
-            # Check price filter
-            if not entry.price_per_point or entry.price_per_point <= 0:
-                price_filtered += 1
-                continue
-
-            if entry.price_per_point < min_price or entry.price_per_point > max_price:
-                price_filtered += 1
-                continue
-
-            # Check resort filter
-            if resort and entry.resort != resort:
-                resort_filtered += 1
-                continue
-
-            filtered_entries.append(entry)
-
-        logger.info(f"Filtering results: date_filtered={date_filtered}, price_filtered={price_filtered}, resort_filtered={resort_filtered}")
-        logger.info(f"Final filtered entries: {len(filtered_entries)} entries matching criteria")
+        today = datetime.now(timezone.utc).date()
+        cutoff_date = today - timedelta(days=time_range * 30)
+
+        # Select every entry inside the cutoff, price range and resort from the columnar cache.
+        # Columns are ordered newest first, so the scan stops at the first entry before the cutoff
+        columns = get_entry_columns()
+        prices = columns.prices
+        resort_ids = columns.resort_ids
+        # A resort that never appears in the data gets an id no row can match
+        resort_id = columns.resort_index.get(resort, -1) if resort else None
+        cutoff_ord = cutoff_date.toordinal()
+        filtered_rows = []
+        for row, sent_date_ord in enumerate(columns.sent_date_ords):
+            # Missing dates are stored as 0, so they also fall before the cutoff
+            if sent_date_ord < cutoff_ord:
+                break
+            price = prices[row]
+            if price > 0 and min_price <= price <= max_price and (resort_id is None or resort_ids[row] == resort_id):
+                filtered_rows.append(row)
+
+        logger.info(f"Final filtered entries: {len(filtered_rows)} entries matching criteria")
 
         # Debug: If we have resort filter, check what entries we found
-        if resort and len(filtered_entries) > 0:
-            resort_prices = [e.price_per_point for e in filtered_entries[:5]]
-            resort_results = [e.result for e in filtered_entries[:5]]
-            resort_dates = [e.sent_date.strftime('%Y-%m-%d') if e.sent_date else 'No date' for e in filtered_entries[:5]]
-            logger.info(f"First 5 {resort} prices: {resort_prices}")
-            logger.info(f"First 5 {resort} results: {resort_results}")
-            logger.info(f"First 5 {resort} dates: {resort_dates}")
-
-            # Count result types for the filtered resort
-            taken_count = len([e for e in filtered_entries if e.result == 'taken'])
-            passed_count = len([e for e in filtered_entries if e.result == 'passed'])
-            pending_count = len([e for e in filtered_entries if e.result == 'pending'])
-            logger.info(f"{resort} result summary: taken={taken_count}, passed={passed_count}, pending={pending_count}")
-        elif resort and len(filtered_entries) == 0:
+        debug_enabled = logger.isEnabledFor(logging.DEBUG)
+        if resort and len(filtered_rows) > 0:
+            if debug_enabled:
+                sample = filtered_rows[:5]
+                logger.debug("First 5 %s prices: %s", resort, [prices[row] for row in sample])
+                logger.debug("First 5 %s results: %s", resort, [columns.result(row) for row in sample])
+                logger.debug("First 5 %s dates: %s", resort,
+                             [date.fromordinal(columns.sent_date_ords[row]).isoformat() for row in sample])
+        elif resort and len(filtered_rows) == 0:
             logger.warning(f"No entries found for resort '{resort}' - checking if resort exists in data")
-            # Get a sample of all resorts from the first 100 entries to help debug
-            sample_resorts = list(set([e.resort for e in entries[:100] if e.resort]))
-            logger.info(f"Sample resorts in data: {sorted(sample_resorts)}")
-
-        # Calculate statistics manager for trends
-        stats_manager = get_statistics_manager()
-        price_trends = stats_manager.get_price_trends()
-
-        # If no stored trends, calculate basic trends from filtered data
-        if not price_trends and filtered_entries:
-            calc = StatisticsCalculator()
-            for entry in filtered_entries:
-                calc.add_entry(entry)
-            price_trends = calc.calculate_price_trends(days=time_range * 30)
+            if debug_enabled:
+                logger.debug("Resorts in data: %s", get_distinct_values('resort'))
 
         # Create time-based trends data from entries (monthly aggregation)
         trends_data = []
-        if filtered_entries:
-            logger.info(f"Processing {len(filtered_entries)} filtered entries for monthly aggregation")
-
-            # Group entries by month
-            monthly_data = {}
-            valid_entries = 0
-            for entry in filtered_entries:
-                if entry.sent_date and entry.price_per_point and entry.price_per_point > 0:
-                    month_key = entry.sent_date.strftime("%Y-%m")
-                    if month_key not in monthly_data:
-                        monthly_data[month_key] = []
-                    monthly_data[month_key].append(entry)
-                    valid_entries += 1
-
-            logger.info(f"Valid entries for monthly aggregation: {valid_entries} out of {len(filtered_entries)}")
-            logger.info(f"Created monthly data for {len(monthly_data)} months: {sorted(monthly_data.keys())}")
+        monthly_data: Dict[str, Dict[str, Any]] = {}
+        if filtered_rows:
+            logger.info(f"Processing {len(filtered_rows)} filtered entries for monthly aggregation")
+
+            monthly_data = aggregate_price_months(columns, filtered_rows)
 
             # Calculate monthly statistics
             for month_key in sorted(monthly_data.keys()):
-                entries = monthly_data[month_key]
-                prices = [e.price_per_point for e in entries if e.price_per_point and e.price_per_point > 0]
-
-                logger.info(f"Month {month_key}: {len(entries)} entries, {len(prices)} valid prices")
-
-                if prices:
-                    # Calculate result counts
-                    taken = len([e for e in entries if e.result == 'taken'])
-                    passed = len([e for e in entries if e.result == 'passed'])
-                    pending = len([e for e in entries if e.result == 'pending'])
-                    total = len(entries)
-
-                    # Calculate ROFR rate - only include resolved entries (taken + passed) in calculation
-                    # Pending entries are excluded since their outcome is unknown
-                    resolved_entries = taken + passed
-                    rofr_rate = (taken / resolved_entries * 100) if resolved_entries > 0 else 0
-
-                    # Add detailed logging for debugging ROFR rate issues
-                    logger.info(f"Month {month_key} ROFR breakdown: taken={taken}, passed={passed}, pending={pending}, total={total}")
-                    logger.info(f"Month {month_key} resolved_entries={resolved_entries}, rofr_rate={rofr_rate}%")
-
-                    # Log sample results for debugging
-                    sample_results = [e.result for e in entries[:5]]
-                    logger.info(f"Month {month_key} sample results: {sample_results}")
-
-                    avg_price = round(sum(prices) / len(prices), 2)
-                    min_price_val = round(min(prices), 2)
-                    max_price_val = round(max(prices), 2)
-
-                    # Calculate alternative ROFR rate including pending entries for comparison
-                    total_non_pending = taken + passed
-                    rofr_rate_with_pending = (taken / total * 100) if total > 0 else 0
-
-                    logger.info(f"Month {month_key} stats: avg=${avg_price}, min=${min_price_val}, max=${max_price_val}")
-                    logger.info(f"Month {month_key} ROFR rate (resolved only): {rofr_rate}% (taken={taken}, resolved={total_non_pending})")
-                    logger.info(f"Month {month_key} ROFR rate (incl pending): {rofr_rate_with_pending:.2f}% (taken={taken}, total={total})")
-                    logger.info(f"Month {month_key} sample prices: {prices[:3] if len(prices) > 3 else prices}")
-
-                    trends_data.append({
-                        'month': month_key,
-                        'averagePrice': avg_price,
-                        'minPrice': min_price_val,
-                        'maxPrice': max_price_val,
-                        'total': total,
-                        'taken': taken,
-                        'passed': passed,
-                        'pending': pending,
-                        'rofrRate': round(rofr_rate, 2),
-                        'rofrRateWithPending': round(rofr_rate_with_pending, 2),
-                        'resolvedEntries': total_non_pending
-                    })
+                month = monthly_data[month_key]
+                taken = month['taken']
+                passed = month['passed']
+                pending = month['pending']
+                total = month['total']
+
+                # Calculate ROFR rate - only include resolved entries (taken + passed) in calculation
+                # Pending entries are excluded since their outcome is unknown
+                resolved_entries = taken + passed
+                rofr_rate = (taken / resolved_entries * 100) if resolved_entries > 0 else 0
+
+                # Calculate alternative ROFR rate including pending entries for comparison
+                rofr_rate_with_pending = (taken / total * 100) if total > 0 else 0
+
+                trends_data.append({
+                    'month': month_key,
+                    'averagePrice': round(month['price_sum'] / total, 2),
+                    'minPrice': round(month['min_price'], 2),
+                    'maxPrice': round(month['max_price'], 2),
+                    'total': total,
+                    'taken': taken,
+                    'passed': passed,
+                    'pending': pending,
+                    'rofrRate': round(rofr_rate, 2),
+                    'rofrRateWithPending': round(rofr_rate_with_pending, 2),
+                    'resolvedEntries': resolved_entries
+                })
 
         logger.info(f"Generated {len(trends_data)} monthly trend data points")
 
-        # Calculate overall statistics for summary
+        # Calculate overall statistics for summary by merging the monthly aggregates
         overall_stats = {}
-        if filtered_entries:
-            all_prices = [e.price_per_point for e in filtered_entries if e.price_per_point and e.price_per_point > 0]
-            if all_prices:
-                # Calculate overall ROFR statistics
-                overall_taken = len([e for e in filtered_entries if e.result == 'taken'])
-                overall_passed = len([e for e in filtered_entries if e.result == 'passed'])
-                overall_pending = len([e for e in filtered_entries if e.result == 'pending'])
-                overall_resolved = overall_taken + overall_passed
-                overall_rofr_rate = (overall_taken / overall_resolved * 100) if overall_resolved > 0 else 0
-
-                logger.info(f"Overall ROFR stats: taken={overall_taken}, passed={overall_passed}, pending={overall_pending}")
-                logger.info(f"Overall ROFR rate: {overall_rofr_rate:.2f}% (resolved entries only)")
-
-                overall_stats = {
-                    'averagePrice': round(sum(all_prices) / len(all_prices), 2),
-                    'minPrice': round(min(all_prices), 2),
-                    'maxPrice': round(max(all_prices), 2),
-                    'overallROFRRate': round(overall_rofr_rate, 2),
-                    'totalTaken': overall_taken,
-                    'totalPassed': overall_passed,
-                    'totalPending': overall_pending,
-                    'totalResolved': overall_resolved
-                }
+        if monthly_data:
+            months = monthly_data.values()
+            overall_total = sum(m['total'] for m in months)
+            overall_taken = sum(m['taken'] for m in months)
+            overall_passed = sum(m['passed'] for m in months)
+            overall_pending = sum(m['pending'] for m in months)
+            overall_resolved = overall_taken + overall_passed
+            overall_rofr_rate = (overall_taken / overall_resolved * 100) if overall_resolved > 0 else 0
+
+            logger.debug("Overall ROFR stats: taken=%s, passed=%s, pending=%s, rate=%.2f%% (resolved entries only)",
+                         overall_taken, overall_passed, overall_pending, overall_rofr_rate)
+
+            overall_stats = {
+                'averagePrice': round(sum(m['price_sum'] for m in months) / overall_total, 2),
+                'minPrice': round(min(m['min_price'] for m in months), 2),
+                'maxPrice': round(max(m['max_price'] for m in months), 2),
+                'overallROFRRate': round(overall_rofr_rate, 2),
+                'totalTaken': overall_taken,
+                'totalPassed': overall_passed,
+                'totalPending': overall_pending,
+                'totalResolved': overall_resolved
+            }
 
         # Prepare response data in expected frontend format
         response_data = {
             'trends': trends_data,
             'summary': {
-                'totalEntries': len(filtered_entries),
+                'totalEntries': len(filtered_rows),
                 'timeRangeMonths': time_range,
                 'filtersApplied': {
                     'minPrice': min_price,
@@ -1400,11 +1669,12 @@ def get_price_trends_analysis(req: func.HttpRequest) -> func.HttpResponse:
                 },
                 'dateRange': {
                     'from': cutoff_date.isoformat(),
-                    'to': datetime.now().date().isoformat()
+                    'to': today.isoformat()
                 },
                 **overall_stats
             }
         }
+        cache_set(response_cache_key, response_data)
 
         return create_success_response(response_data)
 
@@ -1422,72 +1692,81 @@ def debug_resort_data(req: func.HttpRequest) -> func.HttpResponse:
 
         logger.info(f"Debug resort data requested: resort={resort}, limit={limit}")
 
-        # Get storage manager and fetch data
-        storage = get_storage_manager()
-
-        # Get all entries for the resort
-        entries = storage.query_entries_optimized(
-            limit=10000,
-            sort_by='sent_date',
-            sort_order='desc'
-        )
-
-        # Filter by resort
-        resort_entries = [e for e in entries if e.resort == resort]
-
-        logger.info(f"Found {len(resort_entries)} entries for resort {resort}")
-
-        # Get recent entries within last 2 years
-        from datetime import datetime, timedelta
-        cutoff_date = datetime.now().date() - timedelta(days=24 * 30)  # 24 months
-        recent_entries = [e for e in resort_entries if e.sent_date and e.sent_date >= cutoff_date]
-
-        logger.info(f"Found {len(recent_entries)} recent entries (last 24 months) for resort {resort}")
-
-        # Analyze results
-        taken_entries = [e for e in recent_entries if e.result == 'taken']
-        passed_entries = [e for e in recent_entries if e.result == 'passed']
-        pending_entries = [e for e in recent_entries if e.result == 'pending']
-
-        # Get sample entries for debugging
-        sample_entries = recent_entries[:limit]
-        sample_data = []
-
-        for entry in sample_entries:
-            sample_data.append({
-                'username': entry.username,
-                'price_per_point': entry.price_per_point,
-                'points': entry.points,
-                'resort': entry.resort,
-                'sent_date': entry.sent_date.isoformat() if entry.sent_date else None,
-                'result': entry.result,
-                'result_date': entry.result_date.isoformat() if entry.result_date else None,
-                'use_year': entry.use_year
-            })
+        response_cache_key = f"debug_resort:{resort}:{limit}"
+        cached_response = cache_get(response_cache_key)
+        if cached_response is not None:
+            return create_success_response(cached_response)
+
+        # Get all entries for the resort from the columnar cache, newest first
+        columns = get_entry_columns()
+        resort_id = columns.resort_index.get(resort, -1)
+        resort_rows = [row for row, entry_resort_id in enumerate(columns.resort_ids) if entry_resort_id == resort_id]
+
+        logger.info(f"Found {len(resort_rows)} entries for resort {resort}")
+
+        # Count recent entries within last 2 years by result in a single pass
+        cutoff_date = datetime.now(timezone.utc).date() - timedelta(days=24 * 30)  # 24 months
+        cutoff_ord = cutoff_date.toordinal()
+        sent_date_ords = columns.sent_date_ords
+        result_codes = columns.result_codes
+        recent_rows = []
+        code_counts = [0] * len(ResultCodes.NAMES)
+        for row in resort_rows:
+            if sent_date_ords[row] < cutoff_ord:
+                break
+            recent_rows.append(row)
+            code_counts[result_codes[row]] += 1
+        result_counts = {
+            'taken': code_counts[ResultCodes.TAKEN],
+            'passed': code_counts[ResultCodes.PASSED],
+            'pending': code_counts[ResultCodes.PENDING]
+        }
 
-        # Check for other resort variations
-        all_resorts = list(set([e.resort for e in entries if e.resort]))
-        vgc_variations = [r for r in all_resorts if 'vgc' in r.lower() or 'grand' in r.lower() or 'californian' in r.lower()]
+        logger.info(f"Found {len(recent_rows)} recent entries (last 24 months) for resort {resort}")
+
+        # Get sample entries for debugging; orjson writes the date objects in ISO format
+        usernames = columns.usernames
+        points = columns.points
+        result_dates = columns.result_dates
+        use_years = columns.use_years
+        sample_data = [{
+            'username': usernames[row],
+            'price_per_point': columns.price(row),
+            'points': points[row],
+            'resort': resort,
+            'sent_date': date.fromordinal(sent_date_ords[row]),
+            'result': columns.result(row),
+            'result_date': result_dates[row],
+            'use_year': use_years[row]
+        } for row in recent_rows[:limit]]
+
+        # Check for other resort variations, precomputed with the statistics when available
+        resort_codes = get_statistics_manager().get_resort_codes()
+        if resort_codes:
+            all_resorts = resort_codes['resort_codes']
+            vgc_variations = resort_codes['vgc_variations']
+        else:
+            all_resorts = get_distinct_values('resort')
+            vgc_variations = [r for r in all_resorts if VGC_VARIATION_RE.search(r)]
+        taken_count = result_counts['taken']
+        passed_count = result_counts['passed']
 
         response_data = {
             'resort_searched': resort,
-            'total_entries_for_resort': len(resort_entries),
-            'recent_entries_count': len(recent_entries),
-            'result_breakdown': {
-                'taken': len(taken_entries),
-                'passed': len(passed_entries),
-                'pending': len(pending_entries)
-            },
-            'rofr_rate_resolved_only': (len(taken_entries) / (len(taken_entries) + len(passed_entries)) * 100) if (len(taken_entries) + len(passed_entries)) > 0 else 0,
+            'total_entries_for_resort': len(resort_rows),
+            'recent_entries_count': len(recent_rows),
+            'result_breakdown': result_counts,
+            'rofr_rate_resolved_only': (taken_count / (taken_count + passed_count) * 100) if (taken_count + passed_count) > 0 else 0,
             'sample_entries': sample_data,
-            'all_resort_codes_in_db': sorted(all_resorts),
+            'all_resort_codes_in_db': all_resorts,
             'possible_vgc_variations': vgc_variations,
             'cutoff_date': cutoff_date.isoformat(),
             'debug_info': {
-                'total_entries_in_db': len(entries),
+                'total_entries_in_db': len(columns),
                 'query_limit': limit
             }
         }
+        cache_set(response_cache_key, response_data)
 
         return create_success_response(response_data)
 
@@ -1502,9 +1781,11 @@ def health_check(req: func.HttpRequest) -> func.HttpResponse:
     try:
         config = get_config()
 
-        # Test database connection
-        storage = get_storage_manager()
-        _ = storage.query_entries_optimized(limit=1)
+        # Test database connection, reusing a recent successful probe
+        if cache_get('health:database', ttl=HEALTH_CHECK_CACHE_TTL) is None:
+            storage = get_storage_manager()
+            _ = storage.query_entries_optimized(limit=1, fields=['RowKey'])
+            cache_set('health:database', True)
 
         return create_success_response({
             'status': 'healthy',
@@ -1533,7 +1814,7 @@ def handle_cors_preflight(req: func.HttpRequest) -> func.HttpResponse:
         headers={
             'Access-Control-Allow-Origin': '*',
             'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
-            'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept-Encoding',
+            'Access-Control-Allow-Headers': 'Content-Type, Authorization, Accept-Encoding, If-None-Match',
             'Access-Control-Max-Age': '86400'
         }
     )
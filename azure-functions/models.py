@@ -6,13 +6,16 @@ This module contains data classes and utilities for working with Azure Table Sto
 for the ROFR scraper application.
 """
 
+import ast
 import hashlib
+import orjson
 from dataclasses import dataclass
-from datetime import date, datetime
+from functools import cached_property, lru_cache
+from datetime import date, datetime, timezone
 from typing import Optional, Dict, Any
 
 
-@dataclass
+@dataclass(slots=True)
 class ROFREntry:
     """Represents a single ROFR (Right of First Refusal) entry."""
 
@@ -38,13 +41,16 @@ class ROFREntry:
     def generate_hash(self) -> str:
         """Generate a unique hash for this entry for deduplication."""
         entry_key = f"{self.username.lower()}|{self.price_per_point}|{self.total_cost or ''}|{self.points}|{self.resort}|{self.use_year}|{self.sent_date}|{self.result}|{self.result_date or ''}|{self.thread_url}"
-        return hashlib.md5(entry_key.encode()).hexdigest()
+        return hashlib.md5(entry_key.encode(), usedforsecurity=False).hexdigest()
 
-    def to_table_entity(self) -> Dict[str, Any]:
-        """Convert to Azure Table Storage entity format."""
-        # Sanitize partition key for Azure Table Storage while preserving original resort code
-        entry_hash = self.entry_hash or self.generate_hash()
-        partition_key, row_key = TableStorageHelper.validate_entity_keys(self.resort, entry_hash)
+    def to_table_entity(self, now_iso: Optional[str] = None) -> Dict[str, Any]:
+        """Convert to Azure Table Storage entity format, stamped with now_iso when given."""
+        # Sanitize partition key for Azure Table Storage while preserving original resort code.
+        # entry_hash is always an md5 hex digest or a stored RowKey, so it needs no sanitizing
+        # (__post_init__ guarantees entry_hash is set)
+        partition_key = TableStorageHelper.sanitize_partition_key(self.resort)
+        row_key = self.entry_hash
+        now_iso = now_iso or TableStorageHelper.utc_timestamp()
 
         entity = {
             'PartitionKey': partition_key,  # Sanitized partition key
@@ -61,8 +67,8 @@ class ROFREntry:
             'result_date': self.result_date.isoformat() if self.result_date else '',
             'thread_url': self.thread_url,
             'raw_entry': self.raw_entry or '',
-            'created_at': datetime.utcnow().isoformat() + 'Z',
-            'updated_at': datetime.utcnow().isoformat() + 'Z'
+            'created_at': now_iso,
+            'updated_at': now_iso
         }
         return entity
 
@@ -101,14 +107,18 @@ class ThreadInfo:
     thread_start_date: Optional[date] = None
     thread_end_date: Optional[date] = None
 
-    def to_table_entity(self) -> Dict[str, Any]:
-        """Convert to Azure Table Storage entity format."""
-        # Use URL hash as RowKey since URLs can be too long
-        url_hash = hashlib.md5(self.url.encode()).hexdigest()
+    @cached_property
+    def url_hash(self) -> str:
+        """MD5 hash of the thread URL, computed once per instance."""
+        return hashlib.md5(self.url.encode()).hexdigest()
+
+    def to_table_entity(self, now_iso: Optional[str] = None) -> Dict[str, Any]:
+        """Convert to Azure Table Storage entity format, stamped with now_iso when given."""
+        now_iso = now_iso or TableStorageHelper.utc_timestamp()
 
         entity = {
             'PartitionKey': 'thread',  # All threads in same partition
-            'RowKey': url_hash,
+            'RowKey': self.url_hash,  # Use URL hash as RowKey since URLs can be too long
             'url': self.url,
             'title': self.title or '',
             'start_year': self.start_year or 0,
@@ -119,8 +129,8 @@ class ThreadInfo:
             'total_pages': self.total_pages or 0,
             'thread_start_date': self.thread_start_date.isoformat() if self.thread_start_date else '',
             'thread_end_date': self.thread_end_date.isoformat() if self.thread_end_date else '',
-            'created_at': datetime.utcnow().isoformat() + 'Z',
-            'updated_at': datetime.utcnow().isoformat() + 'Z'
+            'created_at': now_iso,
+            'updated_at': now_iso
         }
         return entity
 
@@ -141,7 +151,7 @@ class ThreadInfo:
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class ScrapingSession:
     """Represents a scraping session for tracking and monitoring."""
 
@@ -219,29 +229,33 @@ class TableStorageHelper:
 
         return " and ".join(conditions)
 
+    # Azure Table Storage has restrictions on key characters
+    _ROW_KEY_TABLE = str.maketrans({c: '_' for c in '/\\#?\t\n\r'})
+    # For resort codes with @ and (), create a safe partition key
+    # but preserve the original in the resort field
+    _PARTITION_KEY_TABLE = str.maketrans({**{c: '_' for c in '/\\#?\t\n\r()'}, '@': '_AT_'})
+
     @staticmethod
-    def validate_entity_keys(partition_key: str, row_key: str) -> tuple:
-        """Validate and sanitize partition and row keys for Table Storage."""
-        # Azure Table Storage has restrictions on key characters
-        # Replace problematic characters but preserve @ and () for resort codes
-        invalid_chars = ['/', '\\', '#', '?', '\t', '\n', '\r']
+    def utc_timestamp() -> str:
+        """Get the current UTC time as an ISO 8601 string with a 'Z' suffix."""
+        return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
 
-        sanitized_partition = partition_key
-        sanitized_row = row_key
+    @staticmethod
+    @lru_cache(maxsize=64)
+    def sanitize_partition_key(partition_key: str) -> str:
+        """Sanitize a partition key, caching the result per resort code."""
+        sanitized_partition = partition_key.translate(TableStorageHelper._PARTITION_KEY_TABLE)
 
-        for char in invalid_chars:
-            sanitized_partition = sanitized_partition.replace(char, '_')
-            sanitized_row = sanitized_row.replace(char, '_')
+        # Ensure key is not empty and within length limits (1024 chars max)
+        return sanitized_partition[:1024] if sanitized_partition else 'default'
 
-        # For resort codes with @ and (), create a safe partition key
-        # but preserve the original in the resort field
-        if '@' in sanitized_partition:
-            sanitized_partition = sanitized_partition.replace('@', '_AT_')
-        if '(' in sanitized_partition:
-            sanitized_partition = sanitized_partition.replace('(', '_').replace(')', '_')
+    @staticmethod
+    def validate_entity_keys(partition_key: str, row_key: str) -> tuple:
+        """Validate and sanitize partition and row keys for Table Storage."""
+        sanitized_partition = TableStorageHelper.sanitize_partition_key(partition_key)
+        sanitized_row = row_key.translate(TableStorageHelper._ROW_KEY_TABLE)
 
         # Ensure keys are not empty and within length limits (1024 chars max)
-        sanitized_partition = sanitized_partition[:1024] if sanitized_partition else 'default'
         sanitized_row = sanitized_row[:1024] if sanitized_row else 'default'
 
         return sanitized_partition, sanitized_row
@@ -292,7 +306,24 @@ class ResortCodes:
         ]
 
 
-@dataclass
+class ResultCodes:
+    """Small integer codes for ROFR results, used by columnar entry data."""
+
+    PENDING = 0
+    PASSED = 1
+    TAKEN = 2
+    UNKNOWN = 3
+
+    NAMES = ('pending', 'passed', 'taken', 'unknown')
+    CODES = {'pending': PENDING, 'passed': PASSED, 'taken': TAKEN}
+
+    @classmethod
+    def encode(cls, result: Optional[str]) -> int:
+        """Get the code for a result string, UNKNOWN for anything unexpected."""
+        return cls.CODES.get(result, cls.UNKNOWN)
+
+
+@dataclass(slots=True)
 class StatisticsData:
     """Represents statistics data for separate storage."""
 
@@ -302,30 +333,33 @@ class StatisticsData:
     calculated_at: datetime
     metadata: Optional[Dict[str, Any]] = None
 
-    def to_table_entity(self) -> Dict[str, Any]:
-        """Convert to Azure Table Storage entity format."""
+    def to_table_entity(self, now_iso: Optional[str] = None) -> Dict[str, Any]:
+        """Convert to Azure Table Storage entity format, stamped with now_iso when given."""
+        now_iso = now_iso or TableStorageHelper.utc_timestamp()
         entity = {
             'PartitionKey': self.stat_type,
             'RowKey': self.stat_key,
             'stat_value': str(self.stat_value),
             'calculated_at': self.calculated_at.isoformat() + 'Z',
-            'metadata': str(self.metadata) if self.metadata else '',
-            'created_at': datetime.utcnow().isoformat() + 'Z',
-            'updated_at': datetime.utcnow().isoformat() + 'Z'
+            'metadata': orjson.dumps(self.metadata).decode() if self.metadata else '',
+            'created_at': now_iso,
+            'updated_at': now_iso
         }
         return entity
 
     @classmethod
     def from_table_entity(cls, entity: Dict[str, Any]) -> 'StatisticsData':
         """Create StatisticsData from Azure Table Storage entity."""
-        import json
-
         metadata = None
         if entity.get('metadata'):
             try:
-                metadata = json.loads(entity['metadata'].replace("'", '"'))
-            except:
-                metadata = None
+                metadata = orjson.loads(entity['metadata'])
+            except orjson.JSONDecodeError:
+                # Rows written before metadata was stored as JSON hold a Python repr
+                try:
+                    metadata = ast.literal_eval(entity['metadata'])
+                except (ValueError, SyntaxError):
+                    metadata = None
 
         return cls(
             stat_type=entity.get('PartitionKey', ''),
@@ -339,12 +373,12 @@ class StatisticsData:
 class UseYearHelper:
     """Helper for use year validation and conversion."""
 
-    VALID_USE_YEARS = [
+    VALID_USE_YEARS = frozenset([
         'Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun',
         'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec',
         'January', 'February', 'March', 'April', 'May', 'June',
         'July', 'August', 'September', 'October', 'November', 'December'
-    ]
+    ])
 
     MONTH_ABBREVIATIONS = {
         'January': 'Jan', 'February': 'Feb', 'March': 'Mar',
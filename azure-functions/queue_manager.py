@@ -1,7 +1,8 @@
-import json
+import orjson
+import threading
 import logging
 import hashlib
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from azure.storage.queue import QueueClient
 from azure.core.exceptions import ResourceExistsError
 from datetime import datetime, timedelta
@@ -12,6 +13,10 @@ logger = logging.getLogger(__name__)
 class ROFRQueueManager:
     """Queue manager for complete thread processing."""
 
+    # Queue existence only needs checking once per worker process
+    _queues_created = False
+    _queues_lock = threading.Lock()
+
     def __init__(self, connection_string: str):
         self.connection_string = connection_string
         self.queue_name = "rofr-thread-processing"
@@ -31,7 +36,18 @@ class ROFRQueueManager:
         logger.info("ROFR Queue Manager initialized for complete thread processing")
 
     def _ensure_queues_exist(self):
-        """Ensure all required queues exist."""
+        """Ensure all required queues exist, skipping the check once it has succeeded in this process."""
+        if ROFRQueueManager._queues_created:
+            return
+
+        with ROFRQueueManager._queues_lock:
+            if ROFRQueueManager._queues_created:
+                return
+            self._create_queues()
+            ROFRQueueManager._queues_created = True
+
+    def _create_queues(self):
+        """Create all required queues that do not exist yet."""
         queues = [
             (self.queue_client, self.queue_name),
             (self.stats_queue_client, self.stats_queue_name)
@@ -47,38 +63,46 @@ class ROFRQueueManager:
                 logger.error(f"Error creating queue {queue_name}: {e}")
                 raise
 
-    def add_thread_task(self, thread_info: Dict[str, Any], session_id: str) -> bool:
-        """Add a complete thread processing task to the queue."""
-        try:
-            # Validate input parameters
-            if not thread_info or not isinstance(thread_info, dict):
-                logger.error("Invalid thread_info: must be a non-empty dictionary")
-                return False
+    def _build_thread_task_message(self, thread_info: Dict[str, Any], session_id: str) -> Optional[str]:
+        """Build the base64 queue message for a complete thread task, or None if the input is invalid."""
+        # Validate input parameters
+        if not thread_info or not isinstance(thread_info, dict):
+            logger.error("Invalid thread_info: must be a non-empty dictionary")
+            return None
 
-            if not session_id or not isinstance(session_id, str):
-                logger.error("Invalid session_id: must be a non-empty string")
-                return False
+        if not session_id or not isinstance(session_id, str):
+            logger.error("Invalid session_id: must be a non-empty string")
+            return None
 
-            task_data = {
-                "thread_info": thread_info,
-                "session_id": session_id,
-                "task_type": "complete_thread",
-                "created_at": datetime.utcnow().isoformat(),
-                "thread_title": thread_info.get("title", "Unknown Thread")
-            }
+        task_data = {
+            "thread_info": thread_info,
+            "session_id": session_id,
+            "task_type": "complete_thread",
+            "created_at": datetime.utcnow(),  # orjson writes datetimes in ISO format
+            "thread_title": thread_info.get("title", "Unknown Thread")
+        }
 
-            task_json = json.dumps(task_data)
+        task_json = orjson.dumps(task_data)
 
-            # Validate JSON is not empty
-            if not task_json or task_json.strip() == "":
-                logger.error("Generated JSON is empty")
-                return False
+        # Validate JSON is not empty
+        if not task_json or task_json.strip() == b"":
+            logger.error("Generated JSON is empty")
+            return None
 
-            task_base64 = base64.b64encode(task_json.encode('utf-8')).decode('utf-8')
+        task_base64 = base64.b64encode(task_json).decode('ascii')
 
-            # Validate base64 encoding worked
-            if not task_base64 or task_base64.strip() == "":
-                logger.error("Base64 encoding resulted in empty string")
+        # Validate base64 encoding worked
+        if not task_base64 or task_base64.strip() == "":
+            logger.error("Base64 encoding resulted in empty string")
+            return None
+
+        return task_base64
+
+    def add_thread_task(self, thread_info: Dict[str, Any], session_id: str) -> bool:
+        """Add a complete thread processing task to the queue."""
+        try:
+            task_base64 = self._build_thread_task_message(thread_info, session_id)
+            if task_base64 is None:
                 return False
 
             logger.info(f"Sending message with length: {len(task_base64)}")
@@ -108,17 +132,17 @@ class ROFRQueueManager:
             stats_task = {
                 "task_type": "statistics_update",
                 "trigger_info": trigger_info,
-                "created_at": datetime.utcnow().isoformat()
+                "created_at": datetime.utcnow()
             }
 
-            task_json = json.dumps(stats_task)
+            task_json = orjson.dumps(stats_task)
 
             # Validate JSON is not empty
-            if not task_json or task_json.strip() == "":
+            if not task_json or task_json.strip() == b"":
                 logger.error("Generated stats JSON is empty")
                 return False
 
-            task_base64 = base64.b64encode(task_json.encode('utf-8')).decode('utf-8')
+            task_base64 = base64.b64encode(task_json).decode('ascii')
 
             # Validate base64 encoding worked
             if not task_base64 or task_base64.strip() == "":
@@ -10,18 +10,64 @@ import re
 import os
 import hashlib
 import logging
+from functools import lru_cache
 from datetime import datetime, date
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Union
 from bs4 import BeautifulSoup
+import soupsieve
 
 from models import ROFREntry, ThreadInfo
 
+# Prefer the C-based lxml parser; fall back to the stdlib parser if it is unavailable
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# CSS selectors for forum posts, compiled once instead of on every select call
+_ARTICLE_SELECTOR = soupsieve.compile('article.message')
+_POST_TIME_SELECTOR = soupsieve.compile('time.u-dt')
+_POST_BODY_SELECTOR = soupsieve.compile('.message-body .bbWrapper')
+
+
+@lru_cache(maxsize=4096)
+def _parse_month_day(date_str: str, year: int) -> Optional[date]:
+    """Parse an 'M/D' date string in the given year, or None if it is not a valid date."""
+    month, day = date_str.split('/')
+    try:
+        return date(year, int(month), int(day))
+    except ValueError:
+        return None
+
+
+@lru_cache(maxsize=1024)
+def _timestamp_year(post_timestamp: str) -> Optional[int]:
+    """Get the local year of a Unix timestamp string, or None if it cannot be converted."""
+    try:
+        return datetime.fromtimestamp(int(post_timestamp)).year
+    except (ValueError, TypeError, OSError, OverflowError):
+        return None
+
 
 class ROFRParsingUtils:
     """Shared utilities for parsing ROFR entries from forum posts."""
 
     # Regex pattern for ROFR entries
     ROFR_PATTERN = r'(\w+(?:\s+\w+)?)\s*---\s*\$([0-9.]+)\s*-\s*\$([0-9,.]+)\s*-\s*(\d+)\s*-\s*([A-Z]{2,4}(?:@\w+)?)\s*-\s*(?:([A-Z][a-z]{2})\s*-\s*)?(.*?)-\s*sent\s+(\d+/\d+)(?:,\s*(passed|taken)\s+(\d+/\d+))?'
+    _ROFR_RE = re.compile(ROFR_PATTERN, re.IGNORECASE)
+
+    # Patterns to match different formats of points/year breakdowns
+    _BREAKDOWN_RES = (
+        # Format: 0/'13, 77/'14, 160/'15, 160/'16 (abbreviated years with apostrophes)
+        re.compile(r"(\d+/'?\d{2}(?:\s*,\s*\d+/'?\d{2}){1,})"),
+        # Format: 0/24, 250/25, 125/26 (full years)
+        re.compile(r"(\d+/\d{2}(?:\s*,\s*\d+/\d{2}){1,})"),
+        # Alternative separators
+        re.compile(r"(\d+/'?\d{2}(?:\s*[-;]\s*\d+/'?\d{2}){1,})"),
+    )
+    _COMMA_WS_RE = re.compile(r'\s*,\s*')
+    _DASH_SEMI_RE = re.compile(r'\s*[-;]\s*')
 
     def __init__(self):
         """Initialize the parsing utilities."""
@@ -45,31 +91,22 @@ class ROFRParsingUtils:
         if not raw_entry:
             return ""
 
-        # Multiple patterns to match different formats of points/year breakdowns
-        patterns = [
-            # Format: 0/'13, 77/'14, 160/'15, 160/'16 (abbreviated years with apostrophes)
-            r"(\d+/'?\d{2}(?:\s*,\s*\d+/'?\d{2}){1,})",
-            # Format: 0/24, 250/25, 125/26 (full years)
-            r"(\d+/\d{2}(?:\s*,\s*\d+/\d{2}){1,})",
-            # Alternative separators
-            r"(\d+/'?\d{2}(?:\s*[-;]\s*\d+/'?\d{2}){1,})",
-        ]
-
-        for pattern in patterns:
-            match = re.search(pattern, raw_entry)
+        for pattern in self._BREAKDOWN_RES:
+            match = pattern.search(raw_entry)
             if match:
                 breakdown = match.group(1)
                 # Remove apostrophes if present
                 breakdown = breakdown.replace("'", "")
                 # Normalize spacing around commas
-                breakdown = re.sub(r'\s*,\s*', ', ', breakdown)
-                breakdown = re.sub(r'\s*[-;]\s*', ', ', breakdown)
+                breakdown = self._COMMA_WS_RE.sub(', ', breakdown)
+                breakdown = self._DASH_SEMI_RE.sub(', ', breakdown)
                 breakdown = breakdown.strip()
                 return breakdown
 
         return ""
 
-    def parse_date_string(self, date_str: str, post_timestamp: str = None) -> Optional[date]:
+    def parse_date_string(self, date_str: str, post_timestamp: str = None,
+                          today: Optional[date] = None) -> Optional[date]:
         """
         Parse date string in format M/D or MM/DD to actual date.
 
@@ -79,6 +116,7 @@ class ROFRParsingUtils:
         Args:
             date_str: Date string like "12/31" or "6/15"
             post_timestamp: Unix timestamp string from forum post
+            today: Current date, passed in by callers parsing many dates
 
         Returns:
             Parsed date object or None if parsing fails
@@ -92,49 +130,34 @@ class ROFRParsingUtils:
         try:
             # Handle formats like "6/18", "12/5", etc.
             parts = date_str.split('/')
-            self.logger.debug(f"parse_date_string: split parts = {parts}")
 
             if len(parts) == 2:
-                month = int(parts[0])
-                day = int(parts[1])
-                self.logger.debug(f"parse_date_string: extracted month={month}, day={day}")
-
-                # Validate month and day ranges
-                if not (1 <= month <= 12) or not (1 <= day <= 31):
-                    self.logger.debug(f"parse_date_string: Invalid month ({month}) or day ({day})")
-                    return None
-
                 # Determine year from post_timestamp if available
-                year = datetime.now().year
+                year = None
                 if post_timestamp and post_timestamp.strip():
-                    try:
-                        # post_timestamp is a Unix timestamp, extract year from it
-                        post_datetime = datetime.fromtimestamp(int(post_timestamp))
-                        year = post_datetime.year
-                        self.logger.debug(f"parse_date_string: Using post timestamp {post_timestamp} -> year {year} for date {date_str}")
-                    except (ValueError, TypeError, OSError) as e:
+                    # post_timestamp is a Unix timestamp, extract year from it (cached per timestamp)
+                    year = _timestamp_year(post_timestamp)
+                    if year is None:
                         # If post_timestamp parsing fails, fall back to current year
-                        self.logger.debug(f"parse_date_string: Failed to parse post_timestamp {post_timestamp}, using current year. Error: {e}")
-                        year = datetime.now().year
+                        self.logger.debug(f"parse_date_string: Failed to parse post_timestamp {post_timestamp}, using current year")
+                if year is None:
+                    year = datetime.now().year
 
-                # Create initial date with validation
-                try:
-                    parsed_date = date(year, month, day)
-                    self.logger.debug(f"parse_date_string: initial parsed_date = {parsed_date}")
-                except ValueError as e:
-                    self.logger.debug(f"parse_date_string: Invalid date {year}-{month}-{day}: {e}")
+                # Create initial date with validation (cached, since the same dates repeat across posts)
+                parsed_date = _parse_month_day(date_str, year)
+                if parsed_date is None:
+                    self.logger.debug(f"parse_date_string: Invalid date '{date_str}' for year {year}")
                     return None
 
                 # Check if this date is unreasonably far in the future (more than 30 days)
                 # This handles cases where "12/31" in a 2025 thread should be 2024-12-31
-                today = date.today()
+                today = today or date.today()
                 days_in_future = (parsed_date - today).days
-                self.logger.debug(f"parse_date_string: days_in_future = {days_in_future}")
 
                 if days_in_future > 30:
                     # Try previous year
                     try:
-                        test_date = date(year - 1, month, day)
+                        test_date = parsed_date.replace(year=year - 1)
                         test_days_diff = (test_date - today).days
                         # Use previous year if it's not too far in the past (within 1 year)
                         if test_days_diff >= -365:
@@ -170,7 +193,8 @@ class ROFRParsingUtils:
             self.logger.debug(f"parse_date_string: Exception parsing '{date_str}': {e}")
             return None
 
-    def parse_date_with_thread_year(self, date_str: str, thread_year: Optional[int]) -> Optional[date]:
+    def parse_date_with_thread_year(self, date_str: str, thread_year: Optional[int],
+                                    today: Optional[date] = None) -> Optional[date]:
         """
         Parse date string using thread year context as fallback.
 
@@ -180,6 +204,7 @@ class ROFRParsingUtils:
         Args:
             date_str: Date string like "12/31" or "6/15"
             thread_year: Year extracted from thread title
+            today: Current date, passed in by callers parsing many dates
 
         Returns:
             Parsed date object or None if parsing fails
@@ -191,9 +216,6 @@ class ROFRParsingUtils:
             parts = date_str.split('/')
             if len(parts) == 2:
                 # MM/DD format
-                month = int(parts[0])
-                day = int(parts[1])
-
                 # Use thread year if available, otherwise current year
                 if thread_year:
                     year = thread_year
@@ -201,15 +223,17 @@ class ROFRParsingUtils:
                     year = datetime.now().year
 
                 # Create initial date
-                parsed_date = date(year, month, day)
+                parsed_date = _parse_month_day(date_str, year)
+                if parsed_date is None:
+                    return None
 
                 # Check if this date is unreasonably far in the future (more than 30 days)
-                today = date.today()
+                today = today or date.today()
                 days_in_future = (parsed_date - today).days
 
                 if days_in_future > 30:
                     # Try previous year
-                    test_date = date(year - 1, month, day)
+                    test_date = parsed_date.replace(year=year - 1)
                     test_days_diff = (test_date - today).days
                     # Use previous year if it's not too far in the past (within 1 year)
                     if test_days_diff >= -365:
@@ -261,11 +285,11 @@ class ROFRParsingUtils:
 
         try:
             timestamp_int = int(post_timestamp)
-            # Check for reasonable timestamp range (after 2000, before 2100)
+            # Check for reasonable timestamp range (after 2000, before 2100);
+            # anything in this range converts with datetime.fromtimestamp
             # Unix timestamp for Jan 1, 2000 = 946684800
             # Unix timestamp for Jan 1, 2100 = 4102444800
             if 946684800 <= timestamp_int <= 4102444800:
-                datetime.fromtimestamp(timestamp_int)
                 return True
             else:
                 self.logger.debug(f"post_timestamp {post_timestamp} outside reasonable range")
@@ -286,7 +310,7 @@ class ROFRParsingUtils:
         """
         # Extract data-timestamp from the time element within the post
         post_timestamp = None
-        time_element = article.select_one('time.u-dt')
+        time_element = _POST_TIME_SELECTOR.select_one(article)
         if time_element:
             post_timestamp = time_element.get('data-timestamp')
 
@@ -365,37 +389,51 @@ class ROFRParsingUtils:
         Returns:
             List of validated ROFREntry objects
         """
+        # Every entry contains the literal '---' and 'sent', so most posts can skip the regex entirely
+        if '---' not in post_text or 'sent' not in post_text.lower():
+            return []
+
         entries = []
-        matches = re.finditer(self.ROFR_PATTERN, post_text, re.IGNORECASE)
+        today = date.today()
+
+        # Values that only depend on the post or thread are the same for every match
+        timestamp_valid = self.validate_post_timestamp(post_timestamp)
+        thread_start_year = thread_info.start_year
+        thread_url = thread_info.url
+        # Without poster info every entry is accepted (same rule as validate_username_match)
+        poster_lower = poster_username.lower() if poster_username else None
+
+        matches = self._ROFR_RE.finditer(post_text)
+
+        debug_enabled = self.logger.isEnabledFor(logging.DEBUG)
 
         for match in matches:
-            self.logger.info(f"Processing match as possible ROFR entry: {match.group(0)}")
+            raw_entry = match.group(0)
+            self.logger.info(f"Processing match as possible ROFR entry: {raw_entry}")
 
             try:
-                # Debug all captured groups
-                self.logger.debug(f"Regex groups captured:")
-                for i in range(len(match.groups()) + 1):
-                    try:
-                        group_value = match.group(i)
+                # Unpack all captured groups in one call
+                groups = match.groups()
+                if debug_enabled:
+                    self.logger.debug("Regex groups captured:")
+                    for i, group_value in enumerate((raw_entry,) + groups):
                         self.logger.debug(f"Group {i}: '{group_value}'")
-                    except IndexError:
-                        self.logger.debug(f"Group {i}: <not captured>")
-
-                username = match.group(1).strip()
-                price_per_point = float(match.group(2))
-                total_cost_str = match.group(3).replace(',', '')
-                total_cost = float(total_cost_str)
-                points = int(match.group(4))
-                resort = match.group(5).strip()
-                use_year = match.group(6).strip() if match.group(6) else ""
-                points_breakdown_raw = match.group(7) if match.group(7) else ""
-                sent_date_str = match.group(8)
-                result = match.group(9) if match.group(9) else "pending"
-                result_date_str = match.group(10) if match.group(10) else None
-
-                # Validate post_timestamp and basic entry criteria
-                timestamp_valid = self.validate_post_timestamp(post_timestamp)
-                username_matches = self.validate_username_match(username, poster_username)
+
+                (username, price_str, total_cost_str, points_str, resort, use_year,
+                 points_breakdown_raw, sent_date_str, result, result_date_str) = groups
+
+                username = username.strip()
+                price_per_point = float(price_str)
+                total_cost = float(total_cost_str.replace(',', ''))
+                points = int(points_str)
+                resort = resort.strip()
+                use_year = use_year.strip() if use_year else ""
+                points_breakdown_raw = points_breakdown_raw or ""
+                result = result or "pending"
+                result_date_str = result_date_str or None
+
+                # Validate basic entry criteria
+                username_matches = poster_lower is None or username.lower() == poster_lower
 
                 # debug logging to figure out why the below code is not working as expected
                 self.logger.debug(f"username: {username}, poster_username: {poster_username}, username_matches: {username_matches}")
@@ -427,16 +465,16 @@ class ROFRParsingUtils:
                     result_date = None
 
                     if timestamp_valid:
-                        sent_date = self.parse_date_string(sent_date_str, post_timestamp)
-                        result_date = self.parse_date_string(result_date_str, post_timestamp) if result_date_str else None
+                        sent_date = self.parse_date_string(sent_date_str, post_timestamp, today)
+                        result_date = self.parse_date_string(result_date_str, post_timestamp, today) if result_date_str else None
                         self.logger.debug(f"Parsed dates using timestamp: sent_date={sent_date}, result_date={result_date}")
 
                     # If timestamp parsing failed or timestamp not valid, fall back to thread year
                     if not sent_date:
                         self.logger.debug(f"Timestamp parsing failed or invalid, falling back to thread year method")
-                        sent_date = self.parse_date_with_thread_year(sent_date_str, thread_info.start_year)
-                        result_date = self.parse_date_with_thread_year(result_date_str, thread_info.start_year) if result_date_str else None
-                        self.logger.debug(f"Parsed dates using thread year {thread_info.start_year}: sent_date={sent_date}, result_date={result_date}")
+                        sent_date = self.parse_date_with_thread_year(sent_date_str, thread_start_year, today)
+                        result_date = self.parse_date_with_thread_year(result_date_str, thread_start_year, today) if result_date_str else None
+                        self.logger.debug(f"Parsed dates using thread year {thread_start_year}: sent_date={sent_date}, result_date={result_date}")
 
                     # Skip entry if we still cannot parse sent_date
                     if not sent_date:
@@ -474,7 +512,7 @@ class ROFRParsingUtils:
                     # Create entry hash for deduplication
                     try:
                         entry_key = f"{username.lower()}|{price_per_point}|{points}|{resort}|{use_year}|{sent_date_str}"
-                        entry_hash = hashlib.md5(entry_key.encode()).hexdigest()
+                        entry_hash = hashlib.md5(entry_key.encode(), usedforsecurity=False).hexdigest()
                         self.logger.debug(f"Generated entry hash: {entry_hash}")
                     except Exception as e:
                         self.logger.debug(f"Failed to generate entry hash: {e}")
@@ -493,8 +531,8 @@ class ROFRParsingUtils:
                             sent_date=sent_date,
                             result=result,
                             result_date=result_date,
-                            thread_url=thread_info.url,
-                            raw_entry=match.group(0),
+                            thread_url=thread_url,
+                            raw_entry=raw_entry,
                             entry_hash=entry_hash
                         )
                         entries.append(entry)
@@ -512,7 +550,7 @@ class ROFRParsingUtils:
                         self.logger.debug(f"Failed validation details: username_valid={username_valid}, resort_valid={resort_valid}, points_valid={points_valid}, price_valid={price_valid}, cost_valid={cost_valid}")
 
             except Exception as e:
-                self.logger.error(f"CRITICAL ERROR parsing entry: {match.group(0)}")
+                self.logger.error(f"CRITICAL ERROR parsing entry: {raw_entry}")
                 self.logger.error(f"Error details: {e}")
                 self.logger.error(f"Error type: {type(e).__name__}")
                 import traceback
@@ -522,7 +560,7 @@ class ROFRParsingUtils:
         return entries
 
     def parse_rofr_entries_from_html(self,
-                                   html_content: str,
+                                   html_content: Union[str, bytes],
                                    thread_info: ThreadInfo,
                                    page_number: int,
                                    start_date_filter: Optional[date] = None) -> List[ROFREntry]:
@@ -530,7 +568,7 @@ class ROFRParsingUtils:
         Parse ROFR entries from HTML content by extracting post metadata and text.
 
         Args:
-            html_content: Raw HTML content of the forum page
+            html_content: Raw HTML content of the forum page (str, or UTF-8 bytes)
             thread_info: ThreadInfo object containing thread metadata
             page_number: Page number being processed
             start_date_filter: Optional filter to skip entries before this date
@@ -541,10 +579,16 @@ class ROFRParsingUtils:
         if not html_content:
             return []
 
+        # Every entry contains a literal '---', so a page without one anywhere needs no parsing
+        if (b'---' if isinstance(html_content, bytes) else '---') not in html_content:
+            return []
+
         try:
-            soup = BeautifulSoup(html_content, 'html.parser')
+            # Bytes are decoded once by the parser rather than by the caller
+            from_encoding = 'utf-8' if isinstance(html_content, bytes) else None
+            soup = BeautifulSoup(html_content, HTML_PARSER, from_encoding=from_encoding)
             # Look for the full article elements to access data-date
-            articles = soup.select('article.message')
+            articles = _ARTICLE_SELECTOR.select(soup)
 
             entries = []
             for post_idx, article in enumerate(articles):
@@ -555,7 +599,7 @@ class ROFRParsingUtils:
                 self.logger.debug(f"Page {page_number}, Post {post_idx}: poster username = {poster_username}")
 
                 # Get the post content
-                post_content = article.select_one('.message-body .bbWrapper')
+                post_content = _POST_BODY_SELECTOR.select_one(article)
                 if post_content:
                     post_text = post_content.get_text()
                     post_entries = self.parse_rofr_entries_from_text(
@@ -569,3 +613,30 @@ class ROFRParsingUtils:
         except Exception as e:
             self.logger.error(f"Error parsing HTML for page {page_number}: {e}")
             return []
+
+
+# Parser instance reused by parse_page_entries within each worker process
+_worker_parsing_utils: Optional[ROFRParsingUtils] = None
+
+
+def parse_page_entries(html_content: Union[str, bytes],
+                       thread_info: ThreadInfo,
+                       page_number: int) -> List[ROFREntry]:
+    """
+    Parse ROFR entries from a page of HTML.
+
+    Module-level so it can be dispatched to a ProcessPoolExecutor; the
+    ROFRParsingUtils instance is created once per worker process.
+
+    Args:
+        html_content: Raw HTML content of the forum page
+        thread_info: ThreadInfo object containing thread metadata
+        page_number: Page number being processed
+
+    Returns:
+        List of validated ROFREntry objects
+    """
+    global _worker_parsing_utils
+    if _worker_parsing_utils is None:
+        _worker_parsing_utils = ROFRParsingUtils()
+    return _worker_parsing_utils.parse_rofr_entries_from_html(html_content, thread_info, page_number)
@@ -796,7 +796,10 @@ class AzureROFRScraper:
             # Store price trends
             trends_success = self.stats_manager.store_price_trends(all_stats['price_trends'])
 
-            success = global_success and resort_success and monthly_success and trends_success
+            # Store the distinct resort codes so readers don't have to scan the entries for them
+            codes_success = self.stats_manager.store_resort_codes({entry.resort for entry in all_entries if entry.resort})
+
+            success = global_success and resort_success and monthly_success and trends_success and codes_success
 
             if success:
                 self.logger.info("Successfully calculated and stored all statistics including price trends")
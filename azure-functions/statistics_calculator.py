@@ -3,9 +3,10 @@ Statistics Calculator for ROFR data.
 Calculates comprehensive statistics from ROFR entries for pre-storage.
 """
 
+import heapq
 import logging
-from datetime import datetime, timedelta, date
-from typing import Dict, Any, List
+from datetime import datetime, timedelta, date, timezone
+from typing import Dict, Any, Iterable, List, Optional, Set, Tuple
 import statistics
 from models import ROFREntry
 
@@ -95,11 +96,16 @@ class StatisticsCalculator:
             if entry.sent_date:
                 self.global_data['dates'].append(entry.sent_date)
 
-            # Calculate days between sent_date and result_date
+            # Calculate days between sent_date and result_date once and reuse it
+            # for the global, resort and monthly buckets below
+            days_diff = None
             if entry.sent_date and entry.result_date:
                 days_diff = (entry.result_date - entry.sent_date).days
-                if days_diff >= 0:  # Only count positive differences
-                    self.global_data['days_to_result'].append(days_diff)
+                if days_diff < 0:  # Only count positive differences
+                    days_diff = None
+
+            if days_diff is not None:
+                self.global_data['days_to_result'].append(days_diff)
 
             # Resort-specific data
             if resort not in self.resort_data:
@@ -115,16 +121,14 @@ class StatisticsCalculator:
             if entry.sent_date:
                 resort_info['dates'].append(entry.sent_date)
 
-            # Calculate days between sent_date and result_date for resort
-            if entry.sent_date and entry.result_date:
-                days_diff = (entry.result_date - entry.sent_date).days
-                if days_diff >= 0:  # Only count positive differences
-                    resort_info['days_to_result'].append(days_diff)
+            if days_diff is not None:
+                resort_info['days_to_result'].append(days_diff)
 
             # Monthly data
             if entry.sent_date:
                 try:
-                    month_key = entry.sent_date.strftime("%Y-%m")
+                    sent = entry.sent_date
+                    month_key = f"{sent.year:04d}-{sent.month:02d}"
                     if month_key not in self.monthly_data:
                         self.monthly_data[month_key] = self._init_monthly_data(month_key)
 
@@ -137,11 +141,8 @@ class StatisticsCalculator:
                     if price is not None:
                         monthly_info['prices'].append(price)
 
-                    # Calculate days between sent_date and result_date for monthly data
-                    if entry.result_date:
-                        days_diff = (entry.result_date - entry.sent_date).days
-                        if days_diff >= 0:  # Only count positive differences
-                            monthly_info['days_to_result'].append(days_diff)
+                    if days_diff is not None:
+                        monthly_info['days_to_result'].append(days_diff)
                 except Exception as e:
                     logger.warning(f"Error processing monthly data for entry: {e}")
 
@@ -176,11 +177,10 @@ class StatisticsCalculator:
                     resort_counts[resort] = 0
 
             # Top resorts
-            top_resorts = sorted(
-                [{'resort': k, 'count': v} for k, v in resort_counts.items()],
-                key=lambda x: x['count'],
-                reverse=True
-            )[:10]
+            top_resorts = [
+                {'resort': k, 'count': v}
+                for k, v in heapq.nlargest(10, resort_counts.items(), key=lambda x: x[1])
+            ]
 
             # Date statistics
             latest_entry_date = None
@@ -210,7 +210,7 @@ class StatisticsCalculator:
                 'active_resorts': len([r for r, c in resort_counts.items() if c > 0]),
                 'avg_days_to_result': round(avg_days_to_result, 1) if avg_days_to_result is not None else None,
                 'days_to_result_count': len(data['days_to_result']),
-                'last_calculated': datetime.utcnow().isoformat()
+                'last_calculated': datetime.now(timezone.utc).isoformat()
             }
 
         except Exception as e:
@@ -253,7 +253,7 @@ class StatisticsCalculator:
                     'passed_count': passed_count,
                     'pending_count': pending_count,
                     'latest_entry_date': latest_entry_date.isoformat() if latest_entry_date else None,
-                    'last_calculated': datetime.utcnow().isoformat()
+                    'last_calculated': datetime.now(timezone.utc).isoformat()
                 }
 
             return resort_stats
@@ -281,18 +281,17 @@ class StatisticsCalculator:
                 pending_count = data['results']['pending']
                 rofr_rate = (taken_count / total_entries * 100) if total_entries > 0 else 0
 
-                # Resort counts for this month
+                # Resort counts for this month (single pass over the month's entries)
                 resort_counts = {}
-                for resort in data['resorts']:
-                    resort_entries = [e for e in entries if (e.resort or 'Unknown') == resort]
-                    resort_counts[resort] = len(resort_entries)
+                for e in entries:
+                    resort = e.resort or 'Unknown'
+                    resort_counts[resort] = resort_counts.get(resort, 0) + 1
 
                 # Top resorts for this month
-                top_resorts = sorted(
-                    [{'resort': k, 'count': v} for k, v in resort_counts.items()],
-                    key=lambda x: x['count'],
-                    reverse=True
-                )[:10]
+                top_resorts = [
+                    {'resort': k, 'count': v}
+                    for k, v in heapq.nlargest(10, resort_counts.items(), key=lambda x: x[1])
+                ]
 
                 monthly_stats[month_key] = {
                     'month': month_key,
@@ -308,7 +307,7 @@ class StatisticsCalculator:
                     'passed_count': passed_count,
                     'pending_count': pending_count,
                     'top_resorts': top_resorts,
-                    'last_calculated': datetime.utcnow().isoformat()
+                    'last_calculated': datetime.now(timezone.utc).isoformat()
                 }
 
             return monthly_stats
@@ -379,7 +378,7 @@ class StatisticsCalculator:
                 'trend_period_days': days,
                 'total_entries': len(recent_entries),
                 'trends': trends,
-                'last_calculated': datetime.utcnow().isoformat()
+                'last_calculated': datetime.now(timezone.utc).isoformat()
             }
 
         except Exception as e:
@@ -388,7 +387,7 @@ class StatisticsCalculator:
                 'trend_period_days': days,
                 'total_entries': 0,
                 'trends': {},
-                'last_calculated': datetime.utcnow().isoformat()
+                'last_calculated': datetime.now(timezone.utc).isoformat()
             }
 
     def _calculate_price_stats(self, prices: List[float]) -> Dict[str, float]:
@@ -397,18 +396,30 @@ class StatisticsCalculator:
             return {'avg': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0, 'median': 0.0}
 
         try:
-            # Filter out None values and invalid prices
-            valid_prices = [p for p in prices if p is not None and isinstance(p, (int, float)) and p > 0]
+            # Filter out invalid prices and accumulate sum/min/max in a single pass
+            valid_prices = []
+            total = 0.0
+            min_price = max_price = None
+            for p in prices:
+                if p is None or not isinstance(p, (int, float)) or p <= 0:
+                    continue
+                valid_prices.append(p)
+                total += p
+                if min_price is None or p < min_price:
+                    min_price = p
+                if max_price is None or p > max_price:
+                    max_price = p
 
             if not valid_prices:
                 return {'avg': 0.0, 'min': 0.0, 'max': 0.0, 'count': 0, 'median': 0.0}
 
+            count = len(valid_prices)
             return {
-                'avg': round(sum(valid_prices) / len(valid_prices), 2),
-                'min': round(min(valid_prices), 2),
-                'max': round(max(valid_prices), 2),
-                'count': len(valid_prices),
-                'median': round(statistics.median(valid_prices), 2) if len(valid_prices) > 0 else 0.0
+                'avg': round(total / count, 2),
+                'min': round(min_price, 2),
+                'max': round(max_price, 2),
+                'count': count,
+                'median': round(statistics.median(valid_prices), 2)
             }
         except Exception as e:
             logger.error(f"Error calculating price statistics: {e}")
@@ -432,26 +443,30 @@ class StatisticsCalculator:
             'resort_counts': {},
             'top_resorts': [],
             'active_resorts': 0,
-            'last_calculated': datetime.utcnow().isoformat()
+            'last_calculated': datetime.now(timezone.utc).isoformat()
         }
 
-    def _filter_entries_by_time_range(self, entries: List[ROFREntry], time_range: str) -> List[ROFREntry]:
-        """Filter entries based on time range."""
+    def _get_time_range_cutoff(self, time_range: Optional[str]) -> Optional[date]:
+        """Get the earliest sent_date included in a time range, or None for all entries."""
         if not time_range or time_range == 'all':
-            return entries
+            return None
 
+        today = date.today()
+        if time_range == '3months':
+            return today - timedelta(days=90)
+        elif time_range == '6months':
+            return today - timedelta(days=180)
+        elif time_range == '1year':
+            return today - timedelta(days=365)
+
+        logger.warning(f"Unknown time range: {time_range}, using all entries")
+        return None
+
+    def _filter_entries_by_time_range(self, entries: List[ROFREntry], time_range: str) -> List[ROFREntry]:
+        """Filter entries based on time range."""
         try:
-            cutoff_date = None
-            today = date.today()
-
-            if time_range == '3months':
-                cutoff_date = today - timedelta(days=90)
-            elif time_range == '6months':
-                cutoff_date = today - timedelta(days=180)
-            elif time_range == '1year':
-                cutoff_date = today - timedelta(days=365)
-            else:
-                logger.warning(f"Unknown time range: {time_range}, using all entries")
+            cutoff_date = self._get_time_range_cutoff(time_range)
+            if cutoff_date is None:
                 return entries
 
             # Filter entries by sent_date
@@ -479,33 +494,76 @@ class StatisticsCalculator:
             for entry in filtered_entries:
                 self.add_entry(entry)
 
-            # Calculate all statistics
-            global_stats = self.calculate_global_statistics()
-            resort_stats = self.calculate_resort_statistics()
-            monthly_stats = self.calculate_monthly_statistics()
-            price_trends = self.calculate_price_trends()
+            return self._build_all_statistics(len(entries), len(filtered_entries), time_range)
 
-            return {
-                'global': global_stats,
-                'resorts': resort_stats,
-                'monthly': monthly_stats,
-                'price_trends': price_trends,
-                'calculation_time': datetime.utcnow().isoformat(),
-                'total_entries_processed': len(filtered_entries),
-                'time_range': time_range or 'all',
-                'original_entries_count': len(entries)
-            }
+        except Exception as e:
+            logger.error(f"Error calculating all statistics: {str(e)}")
+            return self._empty_all_statistics(len(entries) if entries else 0, time_range, e)
+
+    def calculate_all_statistics_fused(self, entries: Iterable[ROFREntry],
+                                       time_range: str = None) -> Tuple[Set[str], Dict[str, Any]]:
+        """
+        Filter entries by time range, collect their resorts and calculate all statistics in one pass.
+
+        Entries may be a lazy iterable; only the entries inside the time range are retained.
+        Errors raised by the entries iterable itself (e.g. storage failures) propagate to the caller.
+        Returns (resorts, all_statistics).
+        """
+        total_count = 0
+        filtered_count = 0
+        resorts = set()
+        self.reset()
+        cutoff_date = self._get_time_range_cutoff(time_range)
+
+        for entry in entries:
+            total_count += 1
+            try:
+                if cutoff_date is not None and not (entry.sent_date and entry.sent_date >= cutoff_date):
+                    continue
+                filtered_count += 1
+                if entry.resort:
+                    resorts.add(entry.resort)
+                self.add_entry(entry)
+            except Exception as e:
+                logger.error(f"Error calculating all statistics: {str(e)}")
+                return resorts, self._empty_all_statistics(total_count, time_range, e)
 
+        try:
+            return resorts, self._build_all_statistics(total_count, filtered_count, time_range)
         except Exception as e:
             logger.error(f"Error calculating all statistics: {str(e)}")
-            return {
-                'global': self._empty_global_stats(),
-                'resorts': {},
-                'monthly': {},
-                'price_trends': {},
-                'calculation_time': datetime.utcnow().isoformat(),
-                'total_entries_processed': 0,
-                'time_range': time_range or 'all',
-                'original_entries_count': len(entries) if entries else 0,
-                'error': str(e)
-            }
+            return resorts, self._empty_all_statistics(total_count, time_range, e)
+
+    def _build_all_statistics(self, original_count: int, processed_count: int,
+                              time_range: Optional[str]) -> Dict[str, Any]:
+        """Calculate all statistics from the entries already added to the calculator."""
+        global_stats = self.calculate_global_statistics()
+        resort_stats = self.calculate_resort_statistics()
+        monthly_stats = self.calculate_monthly_statistics()
+        price_trends = self.calculate_price_trends()
+
+        return {
+            'global': global_stats,
+            'resorts': resort_stats,
+            'monthly': monthly_stats,
+            'price_trends': price_trends,
+            'calculation_time': datetime.now(timezone.utc).isoformat(),
+            'total_entries_processed': processed_count,
+            'time_range': time_range or 'all',
+            'original_entries_count': original_count
+        }
+
+    def _empty_all_statistics(self, original_count: int, time_range: Optional[str],
+                              error: Exception) -> Dict[str, Any]:
+        """Result returned when calculating all statistics fails."""
+        return {
+            'global': self._empty_global_stats(),
+            'resorts': {},
+            'monthly': {},
+            'price_trends': {},
+            'calculation_time': datetime.now(timezone.utc).isoformat(),
+            'total_entries_processed': 0,
+            'time_range': time_range or 'all',
+            'original_entries_count': original_count,
+            'error': str(error)
+        }
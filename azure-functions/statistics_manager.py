@@ -4,14 +4,18 @@ Handles storing and retrieving statistics from Azure Table Storage.
 """
 
 import logging
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterable, List, Optional
 from azure.data.tables import TableServiceClient, TableClient
 from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 import json
 
 logger = logging.getLogger(__name__)
 
+# Resort codes that may be spellings of Grand Californian, reported by the resort debug endpoint
+VGC_VARIATION_RE = re.compile(r'vgc|grand|californian', re.IGNORECASE)
+
 class StatisticsManager:
     """Manages pre-calculated statistics in Azure Table Storage."""
 
@@ -173,6 +177,47 @@ class StatisticsManager:
             logger.error(f"Error storing price trends: {str(e)}")
             return False
 
+    def store_resort_codes(self, resort_codes: Iterable[str]) -> bool:
+        """Store the distinct resort codes in the data and their possible VGC variations."""
+        try:
+            resort_codes = sorted(resort_codes)
+            entity = {
+                "PartitionKey": "global",
+                "RowKey": "resort_codes",
+                "resort_codes": json.dumps(resort_codes),
+                "vgc_variations": json.dumps([code for code in resort_codes if VGC_VARIATION_RE.search(code)]),
+                "last_updated": datetime.now(timezone.utc).isoformat()
+            }
+
+            self.stats_table_client.upsert_entity(entity=entity)
+            logger.info(f"Successfully stored {len(resort_codes)} resort codes")
+            return True
+
+        except Exception as e:
+            logger.error(f"Error storing resort codes: {str(e)}")
+            return False
+
+    def get_resort_codes(self) -> Optional[Dict[str, Any]]:
+        """Retrieve the stored resort codes and their possible VGC variations."""
+        try:
+            entity = self.stats_table_client.get_entity(
+                partition_key="global",
+                row_key="resort_codes"
+            )
+
+            return {
+                "resort_codes": json.loads(entity.get("resort_codes", "[]")),
+                "vgc_variations": json.loads(entity.get("vgc_variations", "[]")),
+                "last_updated": entity.get("last_updated")
+            }
+
+        except ResourceNotFoundError:
+            logger.warning("No resort codes found")
+            return None
+        except Exception as e:
+            logger.error(f"Error retrieving resort codes: {str(e)}")
+            return None
+
     def get_global_statistics(self) -> Optional[Dict[str, Any]]:
         """Retrieve the latest global statistics."""
         try:
@@ -267,18 +312,13 @@ class StatisticsManager:
     def get_monthly_statistics(self, months: int = 12) -> List[Dict[str, Any]]:
         """Retrieve monthly statistics for the last N months."""
         try:
-            # Generate month keys for the last N months
-            month_keys = []
-            current_date = datetime.now().replace(day=1)
-
-            for i in range(months):
-                month_key = current_date.strftime("%Y-%m")
-                month_keys.append(month_key)
-                # Go back one month
-                if current_date.month == 1:
-                    current_date = current_date.replace(year=current_date.year - 1, month=12)
-                else:
-                    current_date = current_date.replace(month=current_date.month - 1)
+            # Generate month keys for the last N months from integer month ids (year * 12 + month - 1)
+            now = datetime.now()
+            current_month_id = now.year * 12 + now.month - 1
+            month_keys = [
+                f"{month_id // 12:04d}-{month_id % 12 + 1:02d}"
+                for month_id in range(current_month_id, current_month_id - months, -1)
+            ]
 
             monthly_stats = []
             for month_key in month_keys:
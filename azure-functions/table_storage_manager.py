@@ -12,8 +12,9 @@ This module provides an enhanced table storage manager with:
 import os
 import logging
 import hashlib
+import heapq
 from datetime import datetime, date
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Iterator, List
 import threading
 from dataclasses import dataclass
 import time
@@ -23,6 +24,13 @@ from azure.core.exceptions import AzureError, ResourceNotFoundError, HttpRespons
 
 from models import ROFREntry, ThreadInfo, TableStorageHelper, StatisticsData
 
+# Entry columns returned when a query does not ask for a narrower projection
+ENTRY_COLUMNS = [
+    'PartitionKey', 'RowKey', 'username', 'price_per_point',
+    'total_cost', 'points', 'resort', 'use_year', 'points_details',
+    'sent_date', 'raw_entry', 'result', 'result_date', 'thread_url'
+]
+
 
 @dataclass
 class QueryStats:
@@ -88,6 +96,11 @@ class OptimizedAzureTableStorageManager:
         # Initialize session tracking
         self._current_session_id = None
 
+        # Buffered thread progress rows: session_id -> thread_hash -> entity
+        self._pending_progress: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._pending_progress_since: Optional[float] = None
+        self.progress_flush_interval = 30.0
+
     def _ensure_connections(self):
         """Ensure table service and client connections are established."""
         with self._connection_lock:
@@ -189,7 +202,8 @@ class OptimizedAzureTableStorageManager:
                                sort_by: Optional[str] = None,
                                sort_order: Optional[str] = None,
                                offset: Optional[int] = None,
-                               limit: Optional[int] = 1000) -> List[ROFREntry]:
+                               limit: Optional[int] = 1000,
+                               fields: Optional[List[str]] = None) -> List[ROFREntry]:
         """
         Optimized query with performance optimizations.
 
@@ -219,7 +233,8 @@ class OptimizedAzureTableStorageManager:
                 sort_by=sort_by,
                 sort_order=sort_order,
                 offset=offset,
-                limit=limit if limit is not None else 10000
+                limit=limit if limit is not None else 10000,
+                fields=fields
             )
 
             query_time = time.time() - start_time
@@ -248,7 +263,8 @@ class OptimizedAzureTableStorageManager:
                                 sort_by: Optional[str] = None,
                                 sort_order: Optional[str] = None,
                                 offset: Optional[int] = None,
-                                limit: Optional[int] = 1000) -> tuple[List[ROFREntry], int]:
+                                limit: Optional[int] = 1000,
+                                fields: Optional[List[str]] = None) -> tuple[List[ROFREntry], int]:
         """
         Get both paginated results and total count in one operation.
         Returns (entries, total_count)
@@ -271,7 +287,8 @@ class OptimizedAzureTableStorageManager:
                 min_total_cost=min_total_cost,
                 exclude_result=exclude_result,
                 sort_by=sort_by,
-                sort_order=sort_order
+                sort_order=sort_order,
+                fields=fields
             )
 
             total_count = len(all_entries)
@@ -291,6 +308,96 @@ class OptimizedAzureTableStorageManager:
             self.logger.error(f"Optimized query with count failed: {e}")
             raise
 
+    def distinct_column(self, column: str) -> List[str]:
+        """
+        Get the sorted distinct non-empty values of a single entry column.
+
+        Uses a projection query so only the requested property is transferred.
+        """
+        def query_operation():
+            self._ensure_connections()
+            if not self._entries_table_client:
+                raise AzureError("Entries table client not initialized")
+            entities = self._entries_table_client.query_entities(
+                query_filter="",
+                results_per_page=1000,
+                select=[column]
+            )
+
+            values = set()
+            for entity in entities:
+                value = entity.get(column)
+                if value:
+                    value = str(value).strip()
+                    if value:
+                        values.add(value)
+            return sorted(values)
+
+        start_time = time.time()
+        values = self._execute_with_retry(query_operation)
+        query_time = time.time() - start_time
+        self._record_query_stats(query_time)
+        self.logger.info(f"Distinct '{column}' query completed in {query_time:.2f}s, returned {len(values)} values")
+        return values
+
+    def iter_entries_optimized(self, page_size: int = 1000,
+                               fields: Optional[List[str]] = None) -> Iterator[ROFREntry]:
+        """
+        Stream all entries page by page instead of materializing them in a list.
+
+        Pages are fetched lazily through the service's continuation tokens, so callers
+        that reduce entries as they go only hold one page of entities at a time.
+        """
+        start_time = time.time()
+        self._ensure_connections()
+        if not self._entries_table_client:
+            raise AzureError("Entries table client not initialized")
+
+        pages = self._entries_table_client.query_entities(
+            query_filter="",
+            results_per_page=page_size,
+            select=self._entry_projection(fields, ENTRY_COLUMNS)
+        ).by_page()
+
+        entry_count = 0
+        for page in pages:
+            for entity in page:
+                try:
+                    entry = ROFREntry.from_table_entity(entity)
+                except Exception as e:
+                    self.logger.warning(f"Error processing entity: {e}")
+                    continue
+                entry_count += 1
+                yield entry
+
+        query_time = time.time() - start_time
+        self._record_query_stats(query_time)
+        self.logger.info(f"Streamed {entry_count} entries in {query_time:.2f}s")
+
+    def _entry_projection(self, fields: Optional[List[str]], default: List[str],
+                          filters: Optional[List[str]] = None, sort_by: Optional[str] = None) -> List[str]:
+        """
+        Build the select list for an entries query.
+
+        Without explicit fields the default columns are used. Otherwise the keys plus any
+        column referenced by the filter expressions or sort key are added to the fields so
+        client-side filtering and sorting still see the values they need.
+        """
+        if not fields:
+            return default
+
+        select = ['PartitionKey', 'RowKey']
+        required = list(fields)
+        for expression in filters or []:
+            required.append(expression.split(' ', 1)[0])
+        if sort_by:
+            required.append(sort_by if sort_by in ENTRY_COLUMNS else 'sent_date')
+
+        for column in required:
+            if column not in select:
+                select.append(column)
+        return select
+
     def _execute_optimized_query(self,
                                 resort: Optional[str] = None,
                                 result: Optional[str] = None,
@@ -307,7 +414,8 @@ class OptimizedAzureTableStorageManager:
                                 sort_by: Optional[str] = None,
                                 sort_order: Optional[str] = None,
                                 offset: Optional[int] = None,
-                                limit: Optional[int] = 1000) -> List[ROFREntry]:
+                                limit: Optional[int] = 1000,
+                                fields: Optional[List[str]] = None) -> List[ROFREntry]:
         """Execute the actual optimized query with advanced filtering."""
 
         def query_operation():
@@ -319,7 +427,7 @@ class OptimizedAzureTableStorageManager:
 
             # Resort filter - use partition key when possible for better performance
             if resort:
-                sanitized_resort, _ = TableStorageHelper.validate_entity_keys(resort, "dummy")
+                sanitized_resort = TableStorageHelper.sanitize_partition_key(resort)
                 # Use partition key filter for maximum efficiency
                 filters.append(f"PartitionKey eq '{sanitized_resort}'")
                 # Also filter by resort field for data consistency
@@ -378,11 +486,7 @@ class OptimizedAzureTableStorageManager:
             entities = self._entries_table_client.query_entities(
                 query_filter=filter_expression or "",
                 results_per_page=min(effective_limit, 1000),  # Optimize page size
-                select=[
-                    'PartitionKey', 'RowKey', 'username', 'price_per_point',
-                    'total_cost', 'points', 'resort', 'use_year', 'points_details',
-                    'sent_date', 'raw_entry', 'result', 'result_date', 'thread_url'
-                ]  # Only select needed columns
+                select=self._entry_projection(fields, ENTRY_COLUMNS, filters, sort_by)  # Only select needed columns
             )
 
             # Process entities efficiently
@@ -459,7 +563,8 @@ class OptimizedAzureTableStorageManager:
                                           min_total_cost: Optional[float] = None,
                                           exclude_result: Optional[str] = None,
                                           sort_by: Optional[str] = None,
-                                          sort_order: Optional[str] = None) -> List[ROFREntry]:
+                                          sort_order: Optional[str] = None,
+                                          fields: Optional[List[str]] = None) -> List[ROFREntry]:
         """Execute query to get all entries for count and sorting."""
 
         def query_operation():
@@ -468,7 +573,7 @@ class OptimizedAzureTableStorageManager:
 
             # Resort filter - use partition key when possible for better performance
             if resort:
-                sanitized_resort, _ = TableStorageHelper.validate_entity_keys(resort, "dummy")
+                sanitized_resort = TableStorageHelper.sanitize_partition_key(resort)
                 # Use partition key filter for maximum efficiency
                 filters.append(f"PartitionKey eq '{sanitized_resort}'")
                 # Also filter by resort field for data consistency
@@ -528,11 +633,9 @@ class OptimizedAzureTableStorageManager:
             # Query with filter and select optimizations
             entities = list(self._entries_table_client.query_entities(
                 query_filter=filter_expression,
-                select=[
-                    'PartitionKey', 'RowKey', 'username', 'price_per_point',
-                    'total_cost', 'points', 'resort', 'use_year', 'points_details',
-                    'sent_date', 'result', 'result_date', 'thread_url'
-                ]  # Only select needed columns
+                select=self._entry_projection(
+                    fields, [column for column in ENTRY_COLUMNS if column != 'raw_entry'], filters, sort_by
+                )  # Only select needed columns
             ))
 
             # Process entities efficiently
@@ -758,11 +861,10 @@ class OptimizedAzureTableStorageManager:
         rofr_rate = (result_counts['taken'] / total_entries * 100) if total_entries > 0 else 0
 
         # Get top resorts
-        top_resorts = sorted(
-            [{'resort': k, 'count': v} for k, v in resort_counts.items()],
-            key=lambda x: x['count'],
-            reverse=True
-        )[:10]
+        top_resorts = [
+            {'resort': k, 'count': v}
+            for k, v in heapq.nlargest(10, resort_counts.items(), key=lambda x: x[1])
+        ]
 
         return {
             'total_entries': total_entries,
@@ -778,7 +880,7 @@ class OptimizedAzureTableStorageManager:
             'passed_count': result_counts['passed'],
             'pending_count': result_counts['pending'],
             'active_resorts': len([r for r, c in resort_counts.items() if c > 0]),
-            'last_updated': datetime.utcnow().isoformat() + 'Z'
+            'last_updated': TableStorageHelper.utc_timestamp()
         }
 
     def _process_statistics_batch(self, batch: List[Dict[str, Any]],
@@ -812,56 +914,43 @@ class OptimizedAzureTableStorageManager:
         success_count = 0
         failed_count = 0
 
-        # Deduplicate entries by row key to prevent batch errors
-        unique_entries = {}
+        # Serialize each entry once with a single timestamp for the whole batch, and
+        # deduplicate by row key to prevent batch errors
+        now_iso = TableStorageHelper.utc_timestamp()
+        unique_entities = {}
         duplicate_count = 0
         for entry in entries:
-            entity = entry.to_table_entity()
+            entity = entry.to_table_entity(now_iso=now_iso)
             row_key = entity['RowKey']
             self.logger.debug(f"batch_upsert_entries: Processing entry with RowKey: {row_key}")
             self.logger.debug(f"batch_upsert_entries: Entry details - username: {entry.username}, resort: {entry.resort}, points: {entry.points}, price: {entry.price_per_point}")
             # Keep the latest entry if duplicates exist
-            if row_key in unique_entries:
+            if row_key in unique_entities:
                 duplicate_count += 1
                 self.logger.debug(f"batch_upsert_entries: Found duplicate RowKey: {row_key}")
-            unique_entries[row_key] = entry
-
-        # Convert back to list
-        deduplicated_entries = list(unique_entries.values())
+            unique_entities[row_key] = entity
 
         if duplicate_count > 0:
             self.logger.info(f"Deduplicated {duplicate_count} duplicate entries from batch of {len(entries)} entries")
 
-        self.logger.debug(f"batch_upsert_entries: After deduplication, processing {len(deduplicated_entries)} unique entries")
+        self.logger.debug(f"batch_upsert_entries: After deduplication, processing {len(unique_entities)} unique entries")
 
-        # Group entries by partition key for better batch performance
-        partitioned_entries = {}
-        for entry in deduplicated_entries:
-            entity = entry.to_table_entity()
+        # Group entities by partition key for better batch performance
+        partitioned_entities = {}
+        for entity in unique_entities.values():
             partition_key = entity['PartitionKey']
-            if partition_key not in partitioned_entries:
-                partitioned_entries[partition_key] = []
-            partitioned_entries[partition_key].append(entry)
+            if partition_key not in partitioned_entities:
+                partitioned_entities[partition_key] = []
+            partitioned_entities[partition_key].append(entity)
 
-        # Process each partition separately in batches
-        for partition_key, partition_entries in partitioned_entries.items():
-            for i in range(0, len(partition_entries), self.batch_size):
-                batch = partition_entries[i:i + self.batch_size]
+        # Process each partition separately in batches (row keys are already unique)
+        for partition_key, partition_entities in partitioned_entities.items():
+            for i in range(0, len(partition_entities), self.batch_size):
+                batch = partition_entities[i:i + self.batch_size]
 
                 try:
                     def batch_operation():
-                        operations = []
-                        batch_row_keys = set()
-                        for entry in batch:
-                            entity = entry.to_table_entity()
-                            row_key = entity['RowKey']
-                            self.logger.debug(f"batch_operation: Creating upsert operation for RowKey: {row_key}")
-                            # Skip if we've already seen this row key in this batch
-                            if row_key not in batch_row_keys:
-                                operations.append(('upsert', entity))
-                                batch_row_keys.add(row_key)
-                            else:
-                                self.logger.debug(f"batch_operation: Skipping duplicate RowKey in batch: {row_key}")
+                        operations = [('upsert', entity) for entity in batch]
 
                         self.logger.debug(f"batch_operation: Submitting {len(operations)} operations to Azure Table Storage")
                         # Submit batch transaction
@@ -1017,20 +1106,7 @@ class OptimizedAzureTableStorageManager:
                     partition_key='thread',
                     row_key=url_hash
                 )
-                return {
-                    'url': entity.get('url', ''),
-                    'title': entity.get('title', ''),
-                    'start_year': int(entity.get('start_year', 0)) if entity.get('start_year') else None,
-                    'end_year': int(entity.get('end_year', 0)) if entity.get('end_year') else None,
-                    'start_month': entity.get('start_month', ''),
-                    'end_month': entity.get('end_month', ''),
-                    'last_scraped_page': int(entity.get('last_scraped_page', 0)),
-                    'total_pages': int(entity.get('total_pages', 0)) if entity.get('total_pages') else None,
-                    'thread_start_date': entity.get('thread_start_date', ''),
-                    'thread_end_date': entity.get('thread_end_date', ''),
-                    'created_at': entity.get('created_at', ''),
-                    'updated_at': entity.get('updated_at', '')
-                }
+                return self._thread_entity_to_dict(entity)
 
             return self._execute_with_retry(get_thread_operation)
         except ResourceNotFoundError:
@@ -1039,6 +1115,49 @@ class OptimizedAzureTableStorageManager:
             self.logger.error(f"Error getting thread info: {e}")
             return None
 
+    def get_thread_infos_batch(self, thread_urls: List[str]) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Get stored thread information for several threads in one query, keyed by URL (None on error)."""
+        try:
+            url_by_hash = {hashlib.md5(url.encode(), usedforsecurity=False).hexdigest(): url for url in thread_urls}
+            if not url_by_hash:
+                return {}
+
+            def get_threads_operation():
+                self._ensure_connections()
+                if not self._threads_table_client:
+                    raise AzureError("Threads table client not initialized")
+
+                # All threads share one small partition, so a single partition scan is
+                # cheaper than one point read per thread (and avoids the 15-comparison filter limit)
+                threads = {}
+                for entity in self._threads_table_client.query_entities(query_filter="PartitionKey eq 'thread'"):
+                    url = url_by_hash.get(entity.get('RowKey'))
+                    if url:
+                        threads[url] = self._thread_entity_to_dict(entity)
+                return threads
+
+            return self._execute_with_retry(get_threads_operation)
+        except Exception as e:
+            self.logger.error(f"Error getting thread infos: {e}")
+            return None
+
+    def _thread_entity_to_dict(self, entity: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a threads table entity to the thread info dictionary format."""
+        return {
+            'url': entity.get('url', ''),
+            'title': entity.get('title', ''),
+            'start_year': int(entity.get('start_year', 0)) if entity.get('start_year') else None,
+            'end_year': int(entity.get('end_year', 0)) if entity.get('end_year') else None,
+            'start_month': entity.get('start_month', ''),
+            'end_month': entity.get('end_month', ''),
+            'last_scraped_page': int(entity.get('last_scraped_page', 0)),
+            'total_pages': int(entity.get('total_pages', 0)) if entity.get('total_pages') else None,
+            'thread_start_date': entity.get('thread_start_date', ''),
+            'thread_end_date': entity.get('thread_end_date', ''),
+            'created_at': entity.get('created_at', ''),
+            'updated_at': entity.get('updated_at', '')
+        }
+
     def upsert_thread(self, thread_info: 'ThreadInfo') -> str:
         """Upsert thread information and return thread ID."""
         try:
@@ -1088,7 +1207,7 @@ class OptimizedAzureTableStorageManager:
                     'PartitionKey': session_id_str,
                     'RowKey': 'session_metadata',
                     'session_id': session_id_str,
-                    'started_at': datetime.utcnow().isoformat() + 'Z',
+                    'started_at': TableStorageHelper.utc_timestamp(),
                     'status': 'initializing',
                     'total_threads': 0,
                     'completed_threads': 0,
@@ -1137,7 +1256,7 @@ class OptimizedAzureTableStorageManager:
                     'PartitionKey': session_id,
                     'RowKey': 'session_metadata',
                     'session_id': session_id,
-                    'started_at': datetime.utcnow().isoformat() + 'Z',
+                    'started_at': TableStorageHelper.utc_timestamp(),
                     'status': 'running',
                     'total_threads': 0,
                     'completed_threads': 0,
@@ -1149,14 +1268,14 @@ class OptimizedAzureTableStorageManager:
                 # Update with provided kwargs
                 for key, value in kwargs.items():
                     if key == 'status' and value in ['completed', 'failed']:
-                        entity['completed_at'] = datetime.utcnow().isoformat() + 'Z'
+                        entity['completed_at'] = TableStorageHelper.utc_timestamp()
 
                     if value is None:
                         entity[key] = ''
                     else:
                         entity[key] = str(value)
 
-                entity['updated_at'] = datetime.utcnow().isoformat() + 'Z'
+                entity['updated_at'] = TableStorageHelper.utc_timestamp()
 
                 # Always upsert all properties
                 self._sessions_table_client.upsert_entity(entity=entity)
@@ -1198,8 +1317,8 @@ class OptimizedAzureTableStorageManager:
                     'entries_found': '0',
                     'new_entries': '0',
                     'updated_entries': '0',
-                    'created_at': datetime.utcnow().isoformat() + 'Z',
-                    'updated_at': datetime.utcnow().isoformat() + 'Z'
+                    'created_at': TableStorageHelper.utc_timestamp(),
+                    'updated_at': TableStorageHelper.utc_timestamp()
                 }
 
                 # Add any additional thread data
@@ -1234,29 +1353,7 @@ class OptimizedAzureTableStorageManager:
                 if not self._sessions_table_client:
                     raise AzureError("Sessions table client not initialized")
 
-                # Create entity with default values
-                entity = {
-                    'PartitionKey': session_id,
-                    'RowKey': thread_hash,
-                    'thread_url': thread_url,
-                    'thread_hash': thread_hash,
-                    'status': 'processing',
-                    'start_page': '1',
-                    'current_page': '1',
-                    'pages_processed': '0',
-                    'entries_found': '0',
-                    'new_entries': '0',
-                    'updated_entries': '0',
-                    'created_at': datetime.utcnow().isoformat() + 'Z',
-                    'updated_at': datetime.utcnow().isoformat() + 'Z'
-                }
-
-                # Update with progress data
-                for key, value in progress_data.items():
-                    if value is not None:
-                        entity[key] = str(value)
-
-                entity['updated_at'] = datetime.utcnow().isoformat() + 'Z'
+                entity = self._build_thread_progress_entity(session_id, thread_url, thread_hash, progress_data)
 
                 # Always upsert all properties
                 self._sessions_table_client.upsert_entity(entity=entity)
@@ -1267,9 +1364,91 @@ class OptimizedAzureTableStorageManager:
             self.logger.error(f"Error updating thread progress {thread_hash}: {e}")
             raise
 
+    def _build_thread_progress_entity(self, session_id: str, thread_url: str, thread_hash: str,
+                                      progress_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Build the sessions table entity for a thread's progress."""
+        # Create entity with default values
+        entity = {
+            'PartitionKey': session_id,
+            'RowKey': thread_hash,
+            'thread_url': thread_url,
+            'thread_hash': thread_hash,
+            'status': 'processing',
+            'start_page': 1,
+            'current_page': 1,
+            'pages_processed': 0,
+            'entries_found': 0,
+            'new_entries': 0,
+            'updated_entries': 0,
+            'created_at': TableStorageHelper.utc_timestamp(),
+            'updated_at': TableStorageHelper.utc_timestamp()
+        }
+
+        # Update with progress data, keeping numbers typed so they are stored as Edm.Int32/Double
+        for key, value in progress_data.items():
+            if value is not None:
+                entity[key] = value if isinstance(value, (int, float)) else str(value)
+
+        entity['updated_at'] = TableStorageHelper.utc_timestamp()
+        return entity
+
     def update_thread_progress_batch(self, session_id: str, thread_url: str, **progress_data):
-        """Update thread processing progress by upserting all properties (batch alias)."""
-        return self.update_thread_progress(session_id, thread_url, **progress_data)
+        """Buffer a thread progress update; buffered rows are written by flush_thread_progress."""
+        if not session_id or not thread_url:
+            raise ValueError("session_id and thread_url are required")
+
+        session_id = str(session_id).strip()
+        thread_hash = hashlib.md5(thread_url.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+        # Later updates for the same thread replace earlier ones; only the latest state is written
+        entity = self._build_thread_progress_entity(session_id, thread_url, thread_hash, progress_data)
+        self._pending_progress.setdefault(session_id, {})[thread_hash] = entity
+        if self._pending_progress_since is None:
+            self._pending_progress_since = time.time()
+
+        pending_count = sum(len(rows) for rows in self._pending_progress.values())
+        if (pending_count >= self.batch_size or
+                time.time() - self._pending_progress_since >= self.progress_flush_interval):
+            self.flush_thread_progress()
+
+    def flush_thread_progress(self) -> int:
+        """
+        Write buffered thread progress rows with one transaction per session partition.
+
+        Rows of a failed transaction stay buffered and are retried by the next flush.
+        Returns the number of rows written.
+        """
+        pending = self._pending_progress
+        self._pending_progress = {}
+        self._pending_progress_since = None
+
+        written = 0
+        for session_id, rows in pending.items():
+            entities = list(rows.values())
+            for i in range(0, len(entities), self.batch_size):
+                batch = entities[i:i + self.batch_size]
+                try:
+                    def flush_operation(batch=batch):
+                        self._ensure_connections()
+                        if not self._sessions_table_client:
+                            raise AzureError("Sessions table client not initialized")
+                        self._sessions_table_client.submit_transaction([('upsert', entity) for entity in batch])
+                        return len(batch)
+
+                    written += self._execute_with_retry(flush_operation)
+                except Exception as e:
+                    self.logger.error(f"Error flushing {len(batch)} thread progress rows for session {session_id}, "
+                                      f"keeping them buffered: {e}")
+                    self._rebuffer_thread_progress(session_id, batch)
+        return written
+
+    def _rebuffer_thread_progress(self, session_id: str, entities: List[Dict[str, Any]]):
+        """Put unwritten thread progress rows back in the buffer without replacing newer updates."""
+        rows = self._pending_progress.setdefault(session_id, {})
+        for entity in entities:
+            rows.setdefault(entity['RowKey'], entity)
+        if self._pending_progress_since is None:
+            self._pending_progress_since = time.time()
 
     def get_session_summary(self, session_id: str) -> Optional[Dict[str, Any]]:
         """Get aggregated session summary from all thread entries."""
@@ -1416,7 +1595,7 @@ class OptimizedAzureTableStorageManager:
                     self.update_session_metadata(
                         session_id,
                         status='completed',
-                        completed_at=datetime.utcnow().isoformat() + 'Z'
+                        completed_at=TableStorageHelper.utc_timestamp()
                     )
                     self.logger.info(f"Session {session_id} completed: {completed_threads}/{total_threads} threads, {total_entries} total entries")
                     return True
@@ -1534,7 +1713,7 @@ class OptimizedAzureTableStorageManager:
             self.update_session_metadata(
                 session_id,
                 stats_calculated=True,
-                stats_calculated_at=datetime.utcnow().isoformat() + 'Z'
+                stats_calculated_at=TableStorageHelper.utc_timestamp()
             )
             return True
         except Exception as e:
@@ -1703,10 +1882,8 @@ class OptimizedAzureTableStorageManager:
 
                 try:
                     def batch_stats_operation():
-                        operations = []
-                        for stat in batch:
-                            entity = stat.to_table_entity()
-                            operations.append(('upsert', entity))
+                        now_iso = TableStorageHelper.utc_timestamp()
+                        operations = [('upsert', stat.to_table_entity(now_iso=now_iso)) for stat in batch]
 
                         # Submit batch transaction
                         self._ensure_connections()